@@ -38,6 +38,11 @@ resource "aws_dynamodb_table" "mentions" {
     type = "S"
   }
 
+  attribute {
+    name = "bucket" # Hour bucket: "2024-01-15T14"
+    type = "S"
+  }
+
   # GSI for querying by subreddit
   global_secondary_index {
     name            = "by-subreddit"
@@ -46,6 +51,15 @@ resource "aws_dynamodb_table" "mentions" {
     projection_type = "ALL"
   }
 
+  # GSI for reading a time range hour by hour (trends aggregator)
+  global_secondary_index {
+    name               = "bucket-timestamp-index"
+    hash_key           = "bucket"
+    range_key          = "timestamp_post_id"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["source_type"]
+  }
+
   tags = {
     Name = "${var.project_name}-mentions"
   }
@@ -103,3 +117,49 @@ resource "aws_dynamodb_table" "trends" {
     Name = "${var.project_name}-trends"
   }
 }
+
+# Trending counts table - per-ticker mention counters maintained on write
+resource "aws_dynamodb_table" "trending_counts" {
+  name         = "${var.project_name}-trending-counts"
+  billing_mode = "PAY_PER_REQUEST"
+
+  hash_key  = "period_bucket" # Format: "2024-01-15T14" (hourly) or "2024-01-15" (daily)
+  range_key = "ticker"
+
+  attribute {
+    name = "period_bucket"
+    type = "S"
+  }
+
+  attribute {
+    name = "ticker"
+    type = "S"
+  }
+
+  tags = {
+    Name = "${var.project_name}-trending-counts"
+  }
+}
+
+# Subreddit trending counts table - per-subreddit mention counters maintained on write
+resource "aws_dynamodb_table" "subreddit_trending_counts" {
+  name         = "${var.project_name}-subreddit-trending-counts"
+  billing_mode = "PAY_PER_REQUEST"
+
+  hash_key  = "subreddit_bucket" # Format: "wallstreetbets#2024-01-15T14"
+  range_key = "ticker"
+
+  attribute {
+    name = "subreddit_bucket"
+    type = "S"
+  }
+
+  attribute {
+    name = "ticker"
+    type = "S"
+  }
+
+  tags = {
+    Name = "${var.project_name}-subreddit-trending-counts"
+  }
+}
@@ -111,13 +111,16 @@ resource "aws_iam_role_policy" "ec2_dynamodb" {
           "dynamodb:UpdateItem",
           "dynamodb:Query",
           "dynamodb:Scan",
-          "dynamodb:BatchWriteItem"
+          "dynamodb:BatchWriteItem",
+          "dynamodb:PartiQLInsert"
         ]
         Resource = [
           aws_dynamodb_table.stocks.arn,
           aws_dynamodb_table.mentions.arn,
           "${aws_dynamodb_table.mentions.arn}/index/*",
-          aws_dynamodb_table.metadata.arn
+          aws_dynamodb_table.metadata.arn,
+          aws_dynamodb_table.trending_counts.arn,
+          aws_dynamodb_table.subreddit_trending_counts.arn
         ]
       }
     ]
@@ -222,6 +225,8 @@ resource "aws_instance" "worker" {
     stocks_table              = aws_dynamodb_table.stocks.name
     mentions_table            = aws_dynamodb_table.mentions.name
     metadata_table            = aws_dynamodb_table.metadata.name
+    trending_counts_table     = aws_dynamodb_table.trending_counts.name
+    subreddit_counts_table    = aws_dynamodb_table.subreddit_trending_counts.name
     ssm_client_id_param       = var.reddit_client_id_param
     ssm_client_secret_param   = var.reddit_client_secret_param
     target_subreddits         = join(",", var.target_subreddits)
@@ -55,7 +55,8 @@ resource "aws_iam_role_policy" "lambda_dynamodb" {
           "dynamodb:Query",
           "dynamodb:Scan",
           "dynamodb:BatchWriteItem",
-          "dynamodb:BatchGetItem"
+          "dynamodb:BatchGetItem",
+          "dynamodb:PartiQLInsert"
         ]
         Resource = [
           aws_dynamodb_table.stocks.arn,
@@ -63,7 +64,9 @@ resource "aws_iam_role_policy" "lambda_dynamodb" {
           "${aws_dynamodb_table.mentions.arn}/index/*",
           aws_dynamodb_table.metadata.arn,
           aws_dynamodb_table.trends.arn,
-          "${aws_dynamodb_table.trends.arn}/index/*"
+          "${aws_dynamodb_table.trends.arn}/index/*",
+          aws_dynamodb_table.trending_counts.arn,
+          aws_dynamodb_table.subreddit_trending_counts.arn
         ]
       }
     ]
@@ -64,8 +64,9 @@ resource "aws_lambda_function" "trends_aggregator" {
 
   environment {
     variables = {
-      MENTIONS_TABLE = aws_dynamodb_table.mentions.name
-      TRENDS_TABLE   = aws_dynamodb_table.trends.name
+      MENTIONS_TABLE   = aws_dynamodb_table.mentions.name
+      TRENDS_TABLE     = aws_dynamodb_table.trends.name
+      USE_BUCKET_INDEX = tostring(var.trends_use_bucket_index)
     }
   }
 
@@ -123,8 +124,10 @@ resource "aws_lambda_function" "trends_aggregator" {
 #
 #   environment {
 #     variables = {
-#       STOCKS_TABLE   = aws_dynamodb_table.stocks.name
-#       MENTIONS_TABLE = aws_dynamodb_table.mentions.name
+#       STOCKS_TABLE                    = aws_dynamodb_table.stocks.name
+#       MENTIONS_TABLE                  = aws_dynamodb_table.mentions.name
+#       TRENDING_COUNTS_TABLE           = aws_dynamodb_table.trending_counts.name
+#       SUBREDDIT_TRENDING_COUNTS_TABLE = aws_dynamodb_table.subreddit_trending_counts.name
 #     }
 #   }
 #
@@ -158,9 +161,12 @@ resource "aws_lambda_function" "api_handler" {
 
   environment {
     variables = {
-      STOCKS_TABLE   = aws_dynamodb_table.stocks.name
-      MENTIONS_TABLE = aws_dynamodb_table.mentions.name
-      TRENDS_TABLE   = aws_dynamodb_table.trends.name
+      STOCKS_TABLE                    = aws_dynamodb_table.stocks.name
+      MENTIONS_TABLE                  = aws_dynamodb_table.mentions.name
+      TRENDS_TABLE                    = aws_dynamodb_table.trends.name
+      TRENDING_COUNTS_TABLE           = aws_dynamodb_table.trending_counts.name
+      SUBREDDIT_TRENDING_COUNTS_TABLE = aws_dynamodb_table.subreddit_trending_counts.name
+      TARGET_SUBREDDITS               = join(",", var.target_subreddits)
     }
   }
 
@@ -24,13 +24,16 @@ AWS_REGION=${aws_region}
 STOCKS_TABLE=${stocks_table}
 MENTIONS_TABLE=${mentions_table}
 METADATA_TABLE=${metadata_table}
+TRENDING_COUNTS_TABLE=${trending_counts_table}
+SUBREDDIT_TRENDING_COUNTS_TABLE=${subreddit_counts_table}
 SSM_CLIENT_ID_PARAM=${ssm_client_id_param}
 SSM_CLIENT_SECRET_PARAM=${ssm_client_secret_param}
 TARGET_SUBREDDITS=${target_subreddits}
 DAEMON_SLEEP_SECONDS=${daemon_sleep_seconds}
 POSTS_PER_SUBREDDIT=100
-SUBREDDIT_DELAY_SECONDS=5
-POST_DELAY_SECONDS=0.5
+TICKER_REFRESH_SECONDS=86400
+REDDIT_REQUESTS_PER_MINUTE=100
+REDDIT_CLIENTS=8
 EOF
 
 # Create systemd service
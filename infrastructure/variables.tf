@@ -42,3 +42,11 @@ variable "target_subreddits" {
     "pennystocks"
   ]
 }
+
+# Enable once existing mentions have a bucket attribute
+# (scripts/backfill_mention_buckets.py)
+variable "trends_use_bucket_index" {
+  description = "Aggregate trends from the mentions bucket-timestamp-index GSI instead of scanning"
+  type        = bool
+  default     = false
+}
@@ -4,29 +4,214 @@ Handles all API Gateway requests for the Stock Mentions API.
 """
 
 import os
+import gzip
 import json
+import time
+import base64
 import boto3
+import orjson
+from decimal import Decimal
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from boto3.dynamodb.conditions import Key, Attr
 
-dynamodb = boto3.resource('dynamodb')
+# Max concurrent bucket queries
+BUCKET_QUERY_WORKERS = 16
+
+# Keep connections to DynamoDB alive across warm invocations; botocore
+# already disables Nagle (TCP_NODELAY) on its connections
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=BUCKET_QUERY_WORKERS,
+    retries={'max_attempts': 3, 'mode': 'adaptive'}
+)
+
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
 stocks_table = dynamodb.Table(os.environ['STOCKS_TABLE'])
 mentions_table = dynamodb.Table(os.environ['MENTIONS_TABLE'])
 trends_table = dynamodb.Table(os.environ['TRENDS_TABLE'])
 
+# Counter tables and scan segments are read from worker threads,
+# so use the (thread-safe) client
+dynamodb_client = boto3.client('dynamodb', config=BOTO_CONFIG)
+MENTIONS_TABLE = os.environ['MENTIONS_TABLE']
+TRENDING_COUNTS_TABLE = os.environ['TRENDING_COUNTS_TABLE']
+SUBREDDIT_TRENDING_COUNTS_TABLE = os.environ['SUBREDDIT_TRENDING_COUNTS_TABLE']
+TARGET_SUBREDDITS = os.environ.get('TARGET_SUBREDDITS', '').split(',')
 
-def get_period_start(period):
-    """Get the start timestamp for a given period."""
-    now = datetime.now(timezone.utc)
+# Stocks table row holding every ticker as a string set (written by stock-sync)
+ALL_TICKERS_KEY = '__ALL__'
+
+# Per-request logging is only emitted with LOG_LEVEL=DEBUG
+_DEBUG = os.environ.get('LOG_LEVEL', 'INFO') == 'DEBUG'
+
+# Parallel scan segments for the mentions scan fallback
+SCAN_SEGMENTS = 8
 
+# BatchGetItem reads at most 100 keys per request
+BATCH_GET_SIZE = 100
+
+# Serialized /trending responses cached across warm invocations
+# (period, by_subreddit, gzip) -> (monotonic timestamp, response)
+TRENDING_CACHE_TTL_SECONDS = {'24h': 120, '7d': 300, '30d': 600}
+_TRENDING_CACHE = {}
+
+# Response bodies larger than this are gzipped for clients that accept it
+GZIP_MIN_BYTES = 1024
+
+
+def get_period_delta(period):
+    """Get the length of a given period."""
     if period == '7d':
-        delta = timedelta(days=7)
+        return timedelta(days=7)
     elif period == '30d':
-        delta = timedelta(days=30)
+        return timedelta(days=30)
     else:  # Default 24h
-        delta = timedelta(hours=24)
+        return timedelta(hours=24)
+
+
+def get_period_start(period):
+    """Get the start timestamp for a given period."""
+    return (datetime.now(timezone.utc) - get_period_delta(period)).isoformat()
+
+
+def get_period_buckets(period):
+    """
+    Get the trending-count buckets covering a period: the hours starting
+    inside it (e.g. exactly 24 for 24h), so the window matches
+    get_period_start to within the current hour. Whole UTC days are read
+    from their daily bucket; the partial days at each end use hourly buckets.
+    """
+    now = datetime.now(timezone.utc)
+    last_hour = now.replace(minute=0, second=0, microsecond=0)
+    hour = (now - get_period_delta(period)).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    buckets = []
+    while hour <= last_hour:
+        if hour.hour == 0 and hour + timedelta(hours=23) <= last_hour:
+            buckets.append(hour.strftime('%Y-%m-%d'))
+            hour += timedelta(days=1)
+        else:
+            buckets.append(hour.strftime('%Y-%m-%dT%H'))
+            hour += timedelta(hours=1)
+
+    return buckets
+
+
+def new_counts():
+    """
+    Create an empty pair of per-ticker counters.
+    Counts are kept struct-of-arrays style as (comments, threads) Counters
+    so each update is a single Counter increment.
+    """
+    return Counter(), Counter()
+
+
+def query_bucket_counts(table_name, key_name, bucket):
+    """
+    Read all ticker counters stored under one bucket. Zero counts are
+    dropped, so an empty result means nothing was counted.
+    Returns: (comments Counter, threads Counter)
+    """
+    comments, threads = new_counts()
+    query_kwargs = {
+        'TableName': table_name,
+        'KeyConditionExpression': '#pk = :bucket',
+        'ExpressionAttributeNames': {'#pk': key_name},
+        'ExpressionAttributeValues': {':bucket': {'S': bucket}}
+    }
+
+    while True:
+        response = dynamodb_client.query(**query_kwargs)
+
+        for item in response.get('Items', []):
+            ticker = item['ticker']['S']
+            comment_count = int(item.get('comments', {}).get('N', 0))
+            thread_count = int(item.get('threads', {}).get('N', 0))
+            if comment_count:
+                comments[ticker] = comment_count
+            if thread_count:
+                threads[ticker] = thread_count
+
+        if 'LastEvaluatedKey' not in response:
+            return comments, threads
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def merge_counts(ticker_data, counts):
+    """Add (comments, threads) counts into ticker_data in place."""
+    ticker_data[0].update(counts[0])
+    ticker_data[1].update(counts[1])
+
+
+def has_counts(ticker_data):
+    """True if any ticker has a positive count."""
+    return ticker_data[0].total() + ticker_data[1].total() > 0
+
+
+def sum_bucket_counts(buckets):
+    """
+    Sum overall trending counters across buckets, querying buckets in parallel.
+    Returns: (comments Counter, threads Counter)
+    """
+    ticker_data = new_counts()
+
+    with ThreadPoolExecutor(max_workers=BUCKET_QUERY_WORKERS) as executor:
+        results = executor.map(
+            lambda bucket: query_bucket_counts(TRENDING_COUNTS_TABLE, 'period_bucket', bucket),
+            buckets
+        )
+        for counts in results:
+            merge_counts(ticker_data, counts)
+
+    return ticker_data
+
+
+def sum_subreddit_bucket_counts(subreddits, buckets):
+    """
+    Sum per-subreddit trending counters across buckets, querying every
+    (subreddit, bucket) partition in parallel.
+    Returns: {subreddit: (comments Counter, threads Counter)}
+    """
+    subreddit_data = {subreddit: new_counts() for subreddit in subreddits}
+    keys = [(subreddit, f"{subreddit}#{bucket}") for subreddit in subreddits for bucket in buckets]
 
-    return (now - delta).isoformat()
+    with ThreadPoolExecutor(max_workers=BUCKET_QUERY_WORKERS) as executor:
+        results = executor.map(
+            lambda key: query_bucket_counts(SUBREDDIT_TRENDING_COUNTS_TABLE, 'subreddit_bucket', key[1]),
+            keys
+        )
+        for (subreddit, _), counts in zip(keys, results):
+            merge_counts(subreddit_data[subreddit], counts)
+
+    return subreddit_data
+
+
+def top_ticker_rows(ticker_data, limit):
+    """
+    Format the top tickers by total mentions (comments + threads).
+    most_common uses a bounded heap (O(n log k)) instead of sorting every ticker.
+    """
+    comments, threads = ticker_data
+    totals = comments + threads
+
+    return [
+        {
+            'ticker': ticker,
+            'comments': comments[ticker],
+            'threads': threads[ticker]
+        }
+        for ticker, _ in totals.most_common(limit)
+    ]
+
+
+def json_default(obj):
+    """Serialize DynamoDB numbers (Decimal) that orjson doesn't handle natively."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 def json_response(status_code, body):
@@ -37,7 +222,37 @@ def json_response(status_code, body):
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*'
         },
-        'body': json.dumps(body)
+        'body': orjson.dumps(body, default=json_default).decode('utf-8')
+    }
+
+
+def accepts_gzip(event):
+    """True if the client sent Accept-Encoding: gzip (v2 headers are lowercase)."""
+    headers = event.get('headers') or {}
+    return 'gzip' in headers.get('accept-encoding', '')
+
+
+def gzip_response(response):
+    """
+    Gzip a JSON API response body if it is large enough to be worth it.
+    API Gateway passes the base64-decoded bytes through to the client.
+    Already-compressed responses (cached /trending) are returned as-is.
+    """
+    body = response['body']
+    if response.get('isBase64Encoded') or len(body) <= GZIP_MIN_BYTES:
+        return response
+
+    compressed = gzip.compress(body.encode('utf-8'), compresslevel=6)
+
+    return {
+        'statusCode': response['statusCode'],
+        'headers': {
+            **response['headers'],
+            'Content-Encoding': 'gzip',
+            'Vary': 'Accept-Encoding'
+        },
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
     }
 
 
@@ -45,14 +260,43 @@ def handle_trending(event):
     """
     GET /trending
     Returns top mentioned tickers with comment/thread breakdown.
-    Now reads from pre-aggregated trends table for fast queries.
+    Successful responses (already serialized and, if accepted, gzipped) are
+    cached in memory for a short per-period TTL, since the underlying data
+    changes at most every few minutes.
     """
     params = event.get('queryStringParameters') or {}
     period = params.get('period', '24h')
     by_subreddit = params.get('by_subreddit', 'false').lower() == 'true'
+    use_gzip = accepts_gzip(event)
 
-    # If requesting by_subreddit, fall back to real-time scan
-    # (subreddit breakdown not pre-aggregated yet)
+    ttl = TRENDING_CACHE_TTL_SECONDS.get(period)
+    cache_key = (period, by_subreddit, use_gzip)
+    cached = _TRENDING_CACHE.get(cache_key)
+
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+
+    response = build_trending_response(event)
+    if use_gzip:
+        response = gzip_response(response)
+
+    # Only known periods are cached so arbitrary query strings can't grow the cache
+    if ttl and response['statusCode'] == 200:
+        _TRENDING_CACHE[cache_key] = (time.monotonic(), response)
+
+    return response
+
+
+def build_trending_response(event):
+    """
+    Build the /trending response.
+    Reads from pre-aggregated trends table for fast queries.
+    """
+    params = event.get('queryStringParameters') or {}
+    period = params.get('period', '24h')
+    by_subreddit = params.get('by_subreddit', 'false').lower() == 'true'
+
+    # Subreddit breakdown is served from the per-subreddit counters
     if by_subreddit:
         return handle_trending_realtime(event)
 
@@ -100,9 +344,9 @@ def handle_trending(event):
 
 def handle_trending_realtime(event):
     """
-    FALLBACK: Real-time trending calculation by scanning mentions table.
+    FALLBACK: Real-time trending calculation from the trending counts tables.
     Used when:
-    - by_subreddit=true (not pre-aggregated)
+    - by_subreddit=true (only kept in the per-subreddit counters)
     - Trends table is empty (first run)
     - Trends table query fails
     """
@@ -110,155 +354,291 @@ def handle_trending_realtime(event):
     period = params.get('period', '24h')
     by_subreddit = params.get('by_subreddit', 'false').lower() == 'true'
 
-    period_start = get_period_start(period)
+    if by_subreddit:
+        return handle_trending_by_subreddit(period)
+
+    try:
+        ticker_data = sum_bucket_counts(get_period_buckets(period))
+    except Exception as e:
+        print(f"Error reading trending counts: {e}")
+        return handle_trending_scan(period)
+
+    # Counters only cover mentions written since they were introduced
+    # (until backfilled with scripts/backfill_trending_counts.py)
+    if not has_counts(ticker_data):
+        print(f"No trending counts found for period {period}. Falling back to scan.")
+        return handle_trending_scan(period)
+
+    return json_response(200, {
+        'period': period,
+        'lastUpdated': datetime.now(timezone.utc).isoformat(),
+        'data': top_ticker_rows(ticker_data, 20)
+    })
 
-    ticker_data = {}  # ticker -> {comments: int, threads: int}
-    subreddit_data = {}  # subreddit -> {ticker -> {comments, threads}}
 
+def handle_trending_by_subreddit(period):
+    """
+    Trending tickers broken down by subreddit, read from the per-subreddit
+    trending counts table for each tracked subreddit. Falls back to scanning
+    the mentions table when there are no counters for the period.
+    """
     try:
-        response = mentions_table.scan(
-            FilterExpression='timestamp_post_id >= :start',
-            ExpressionAttributeValues={':start': period_start}
+        subreddit_data = sum_subreddit_bucket_counts(
+            [name for name in TARGET_SUBREDDITS if name],
+            get_period_buckets(period)
         )
+    except Exception as e:
+        print(f"Error reading subreddit trending counts: {e}")
+        subreddit_data = {}
+
+    # Counters only cover mentions written since they were introduced
+    # (until backfilled with scripts/backfill_trending_counts.py)
+    if not any(has_counts(tickers) for tickers in subreddit_data.values()):
+        print(f"No subreddit trending counts found for period {period}. Falling back to scan.")
+        try:
+            subreddit_data = scan_subreddit_counts(get_period_start(period))
+        except Exception as e:
+            print(f"Error scanning mentions: {e}")
+            return json_response(500, {'error': 'Failed to fetch trending data'})
+
+    subreddits = []
+    ticker_data = new_counts()  # across subreddits
+
+    for subreddit_name, tickers in subreddit_data.items():
+        if not has_counts(tickers):
+            continue
+
+        merge_counts(ticker_data, tickers)
+        subreddits.append({
+            'id': subreddit_name,
+            'name': f'r/{subreddit_name}',
+            'rows': top_ticker_rows(tickers, 10)
+        })
+
+    return json_response(200, {
+        'period': period,
+        'lastUpdated': datetime.now(timezone.utc).isoformat(),
+        'subreddits': subreddits,
+        'all': top_ticker_rows(ticker_data, 10)
+    })
+
+
+def scan_segment_counts(segment, period_start):
+    """
+    Count mentions per ticker in one segment of a parallel mentions scan.
+    Returns: (comments Counter, threads Counter)
+    """
+    comments, threads = new_counts()
+    scan_kwargs = {
+        'TableName': MENTIONS_TABLE,
+        'FilterExpression': 'timestamp_post_id >= :start',
+        'ExpressionAttributeValues': {':start': {'S': period_start}},
+        # Only fetch the attributes we count on
+        'ProjectionExpression': 'ticker, source_type',
+        'Segment': segment,
+        'TotalSegments': SCAN_SEGMENTS
+    }
+
+    while True:
+        response = dynamodb_client.scan(**scan_kwargs)
 
         for item in response.get('Items', []):
-            ticker = item['ticker']
-            source_type = item.get('source_type', 'post')
-            subreddit = item.get('subreddit', 'unknown')
+            if item.get('source_type', {}).get('S') == 'comment':
+                comments[item['ticker']['S']] += 1
+            else:
+                threads[item['ticker']['S']] += 1
 
-            # Overall ticker data
-            if ticker not in ticker_data:
-                ticker_data[ticker] = {'comments': 0, 'threads': 0}
+        if 'LastEvaluatedKey' not in response:
+            return comments, threads
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
 
-            if source_type == 'comment':
-                ticker_data[ticker]['comments'] += 1
+
+def scan_segment_subreddit_counts(segment, period_start):
+    """
+    Count mentions per subreddit and ticker in one segment of a parallel
+    mentions scan.
+    Returns: {subreddit: (comments Counter, threads Counter)}
+    """
+    subreddit_data = {}
+    scan_kwargs = {
+        'TableName': MENTIONS_TABLE,
+        'FilterExpression': 'timestamp_post_id >= :start',
+        'ExpressionAttributeValues': {':start': {'S': period_start}},
+        # Only fetch the attributes we count on
+        'ProjectionExpression': 'ticker, subreddit, source_type',
+        'Segment': segment,
+        'TotalSegments': SCAN_SEGMENTS
+    }
+
+    while True:
+        response = dynamodb_client.scan(**scan_kwargs)
+
+        for item in response.get('Items', []):
+            subreddit = item.get('subreddit', {}).get('S', 'unknown')
+            if subreddit not in subreddit_data:
+                subreddit_data[subreddit] = new_counts()
+            comments, threads = subreddit_data[subreddit]
+
+            if item.get('source_type', {}).get('S') == 'comment':
+                comments[item['ticker']['S']] += 1
             else:
-                ticker_data[ticker]['threads'] += 1
+                threads[item['ticker']['S']] += 1
+
+        if 'LastEvaluatedKey' not in response:
+            return subreddit_data
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def scan_subreddit_counts(period_start):
+    """
+    Count mentions since period_start per subreddit and ticker, scanning
+    the mentions table segments in parallel.
+    Returns: {subreddit: (comments Counter, threads Counter)}
+    """
+    subreddit_data = {}
 
-            # Per-subreddit ticker data
-            if by_subreddit:
+    with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as executor:
+        results = executor.map(
+            lambda segment: scan_segment_subreddit_counts(segment, period_start),
+            range(SCAN_SEGMENTS)
+        )
+        for segment_data in results:
+            for subreddit, counts in segment_data.items():
                 if subreddit not in subreddit_data:
-                    subreddit_data[subreddit] = {}
-                if ticker not in subreddit_data[subreddit]:
-                    subreddit_data[subreddit][ticker] = {'comments': 0, 'threads': 0}
-
-                if source_type == 'comment':
-                    subreddit_data[subreddit][ticker]['comments'] += 1
-                else:
-                    subreddit_data[subreddit][ticker]['threads'] += 1
-
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = mentions_table.scan(
-                FilterExpression='timestamp_post_id >= :start',
-                ExpressionAttributeValues={':start': period_start},
-                ExclusiveStartKey=response['LastEvaluatedKey']
+                    subreddit_data[subreddit] = new_counts()
+                merge_counts(subreddit_data[subreddit], counts)
+
+    return subreddit_data
+
+
+def handle_trending_scan(period):
+    """
+    LAST RESORT: Real-time trending calculation by scanning mentions table.
+    Used when the trending counts table has no data for the period.
+    Segments are scanned in parallel so page fetches overlap.
+    """
+    period_start = get_period_start(period)
+
+    ticker_data = new_counts()
+
+    try:
+        with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as executor:
+            results = executor.map(
+                lambda segment: scan_segment_counts(segment, period_start),
+                range(SCAN_SEGMENTS)
             )
-            for item in response.get('Items', []):
-                ticker = item['ticker']
-                source_type = item.get('source_type', 'post')
-                subreddit = item.get('subreddit', 'unknown')
-
-                if ticker not in ticker_data:
-                    ticker_data[ticker] = {'comments': 0, 'threads': 0}
-
-                if source_type == 'comment':
-                    ticker_data[ticker]['comments'] += 1
-                else:
-                    ticker_data[ticker]['threads'] += 1
-
-                if by_subreddit:
-                    if subreddit not in subreddit_data:
-                        subreddit_data[subreddit] = {}
-                    if ticker not in subreddit_data[subreddit]:
-                        subreddit_data[subreddit][ticker] = {'comments': 0, 'threads': 0}
-
-                    if source_type == 'comment':
-                        subreddit_data[subreddit][ticker]['comments'] += 1
-                    else:
-                        subreddit_data[subreddit][ticker]['threads'] += 1
+            for counts in results:
+                merge_counts(ticker_data, counts)
 
     except Exception as e:
         print(f"Error scanning mentions: {e}")
         return json_response(500, {'error': 'Failed to fetch trending data'})
 
-    # Build response
-    response_data = {
+    return json_response(200, {
         'period': period,
-        'lastUpdated': datetime.now(timezone.utc).isoformat()
+        'lastUpdated': datetime.now(timezone.utc).isoformat(),
+        'data': top_ticker_rows(ticker_data, 20)
+    })
+
+
+def count_ticker_mentions(symbol, period_start, source_type=None):
+    """
+    Count a ticker's mentions since period_start without fetching items
+    (Select='COUNT' is evaluated server-side). With source_type, only
+    mentions of that type ('post' or 'comment') are counted.
+    """
+    total = 0
+    query_kwargs = {
+        'KeyConditionExpression': Key('ticker').eq(symbol) & Key('timestamp_post_id').gte(period_start),
+        'Select': 'COUNT'
     }
+    if source_type:
+        query_kwargs['FilterExpression'] = Attr('source_type').eq(source_type)
 
-    if by_subreddit:
-        # Format by subreddit
-        subreddits = []
-        for subreddit_name, tickers in subreddit_data.items():
-            sorted_tickers = sorted(
-                tickers.items(),
-                key=lambda x: x[1]['comments'] + x[1]['threads'],
-                reverse=True
-            )[:10]
-
-            rows = [
-                {
-                    'ticker': ticker,
-                    'comments': data['comments'],
-                    'threads': data['threads']
-                }
-                for ticker, data in sorted_tickers
-            ]
-
-            subreddits.append({
-                'id': subreddit_name,
-                'name': f'r/{subreddit_name}',
-                'rows': rows
-            })
-
-        # Overall top tickers
-        sorted_all = sorted(
-            ticker_data.items(),
-            key=lambda x: x[1]['comments'] + x[1]['threads'],
-            reverse=True
-        )[:10]
-
-        all_tickers = [
-            {
-                'ticker': ticker,
-                'comments': data['comments'],
-                'threads': data['threads']
-            }
-            for ticker, data in sorted_all
-        ]
+    while True:
+        response = mentions_table.query(**query_kwargs)
+        total += response['Count']
 
-        response_data['subreddits'] = subreddits
-        response_data['all'] = all_tickers
-    else:
-        # Simple format - just top tickers
-        sorted_tickers = sorted(
-            ticker_data.items(),
-            key=lambda x: x[1]['comments'] + x[1]['threads'],
-            reverse=True
-        )[:20]
+        if 'LastEvaluatedKey' not in response:
+            return total
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
 
-        data = [
-            {
-                'ticker': ticker,
-                'comments': data['comments'],
-                'threads': data['threads']
-            }
-            for ticker, data in sorted_tickers
-        ]
-        response_data['data'] = data
 
-    return json_response(200, response_data)
+def get_subreddit_counters(keys):
+    """Read per-subreddit counter items by key with BatchGetItem."""
+    items = []
+    request_items = {
+        SUBREDDIT_TRENDING_COUNTS_TABLE: {
+            'Keys': keys,
+            'ProjectionExpression': 'subreddit_bucket, comments, threads'
+        }
+    }
+
+    while request_items:
+        response = dynamodb_client.batch_get_item(RequestItems=request_items)
+        items.extend(response['Responses'].get(SUBREDDIT_TRENDING_COUNTS_TABLE, []))
+        request_items = response.get('UnprocessedKeys')
+
+    return items
+
+
+def count_ticker_breakdown(symbol, period):
+    """
+    Count a ticker's mentions in a period by source type and subreddit
+    from its per-subreddit trending counters, reading one small counter
+    item per (subreddit, bucket) instead of every mention.
+    Returns: (total, post count, comment count, {subreddit: count})
+    """
+    post_count = 0
+    comment_count = 0
+    by_subreddit = Counter()
+
+    keys = [
+        {'subreddit_bucket': {'S': f"{subreddit}#{bucket}"}, 'ticker': {'S': symbol}}
+        for subreddit in TARGET_SUBREDDITS
+        for bucket in get_period_buckets(period)
+    ]
+    batches = [keys[i:i + BATCH_GET_SIZE] for i in range(0, len(keys), BATCH_GET_SIZE)]
+
+    with ThreadPoolExecutor(max_workers=BUCKET_QUERY_WORKERS) as executor:
+        for items in executor.map(get_subreddit_counters, batches):
+            for item in items:
+                comments = int(item.get('comments', {}).get('N', 0))
+                threads = int(item.get('threads', {}).get('N', 0))
+
+                post_count += threads
+                comment_count += comments
+                by_subreddit[item['subreddit_bucket']['S'].rsplit('#', 1)[0]] += comments + threads
+
+    return post_count + comment_count, post_count, comment_count, dict(+by_subreddit)
+
+
+def count_ticker_breakdown_fallback(symbol, period_start):
+    """
+    Count a ticker's mentions by source type with server-side COUNT
+    queries, for when the counters are missing its mentions (e.g. stored
+    before the counters were backfilled). The per-subreddit breakdown
+    isn't available.
+    Returns: (total, post count, comment count, {})
+    """
+    post_count = count_ticker_mentions(symbol, period_start, 'post')
+    comment_count = count_ticker_mentions(symbol, period_start, 'comment')
+    return post_count + comment_count, post_count, comment_count, {}
 
 
 def handle_ticker(event, symbol):
     """
     GET /ticker/{symbol}
     Returns mention history for a specific ticker.
+    With count_only=true, returns just the mention count.
     """
     symbol = symbol.upper()
-    period = event.get('queryStringParameters', {}).get('period', '24h') if event.get('queryStringParameters') else '24h'
+    if symbol == ALL_TICKERS_KEY:
+        return json_response(404, {'error': f'Ticker {symbol} not found'})
+
+    params = event.get('queryStringParameters') or {}
+    period = params.get('period', '24h')
+    count_only = params.get('count_only', 'false').lower() == 'true'
     period_start = get_period_start(period)
 
     # Get stock info
@@ -272,52 +652,63 @@ def handle_ticker(event, symbol):
     if not stock_info:
         return json_response(404, {'error': f'Ticker {symbol} not found'})
 
-    # Get mentions for this ticker
-    mentions = []
-    by_subreddit = {}
+    if count_only:
+        try:
+            total_mentions = count_ticker_mentions(symbol, period_start)
+        except Exception as e:
+            print(f"Error counting mentions: {e}")
+            return json_response(500, {'error': 'Failed to fetch ticker data'})
+
+        return json_response(200, {
+            'ticker': symbol,
+            'period': period,
+            'total_mentions': total_mentions
+        })
+
+    recent_posts = []  # Most recent 10
 
     try:
+        # Only the 10 rendered mentions are fetched in full
         response = mentions_table.query(
             KeyConditionExpression=Key('ticker').eq(symbol) & Key('timestamp_post_id').gte(period_start),
-            ScanIndexForward=False  # Most recent first
+            ScanIndexForward=False,  # Most recent first
+            Limit=10
         )
 
-        for item in response.get('Items', []):
-            mentions.append(item)
-            sub = item['subreddit']
-            by_subreddit[sub] = by_subreddit.get(sub, 0) + 1
+        for m in response.get('Items', []):
+            source_type = m.get('source_type', 'post')
+            item = {
+                'subreddit': m['subreddit'],
+                'upvotes': m['upvotes'],
+                'url': m['url'],
+                'timestamp': m['timestamp_post_id'].split('#')[0],
+                'source_type': source_type
+            }
+
+            if source_type == 'comment':
+                item['comment_body'] = m.get('comment_body', '')[:200]  # Truncate
+            else:
+                item['title'] = m.get('post_title', '')
+
+            recent_posts.append(item)
+
+        total_mentions, post_count, comment_count, by_subreddit = count_ticker_breakdown(symbol, period)
+
+        # Mentions but no counted ones: the counters haven't been backfilled
+        if recent_posts and not total_mentions:
+            total_mentions, post_count, comment_count, by_subreddit = count_ticker_breakdown_fallback(
+                symbol, period_start
+            )
 
     except Exception as e:
         print(f"Error querying mentions: {e}")
         return json_response(500, {'error': 'Failed to fetch ticker data'})
 
-    # Count by source type
-    post_count = sum(1 for m in mentions if m.get('source_type') == 'post')
-    comment_count = sum(1 for m in mentions if m.get('source_type') == 'comment')
-
-    # Format recent posts (top 10)
-    recent_posts = []
-    for m in mentions[:10]:
-        item = {
-            'subreddit': m['subreddit'],
-            'upvotes': m['upvotes'],
-            'url': m['url'],
-            'timestamp': m['timestamp_post_id'].split('#')[0],
-            'source_type': m.get('source_type', 'post')
-        }
-        
-        if m.get('source_type') == 'comment':
-            item['comment_body'] = m.get('comment_body', '')[:200]  # Truncate
-        else:
-            item['title'] = m.get('post_title', '')
-        
-        recent_posts.append(item)
-
     return json_response(200, {
         'ticker': symbol,
         'company_name': stock_info.get('company_name', ''),
         'period': period,
-        'total_mentions': len(mentions),
+        'total_mentions': total_mentions,
         'post_mentions': post_count,
         'comment_mentions': comment_count,
         'by_subreddit': by_subreddit,
@@ -333,7 +724,7 @@ def handle_subreddit(event, name):
     period = event.get('queryStringParameters', {}).get('period', '24h') if event.get('queryStringParameters') else '24h'
     period_start = get_period_start(period)
 
-    ticker_data = {}  # ticker -> {comments: int, threads: int}
+    comments, threads = new_counts()
 
     try:
         # Query the GSI by subreddit
@@ -344,63 +735,47 @@ def handle_subreddit(event, name):
         )
 
         for item in response.get('Items', []):
-            ticker = item['ticker']
-            source_type = item.get('source_type', 'post')
-            
-            if ticker not in ticker_data:
-                ticker_data[ticker] = {'comments': 0, 'threads': 0}
-            
-            if source_type == 'comment':
-                ticker_data[ticker]['comments'] += 1
+            if item.get('source_type') == 'comment':
+                comments[item['ticker']] += 1
             else:
-                ticker_data[ticker]['threads'] += 1
+                threads[item['ticker']] += 1
 
     except Exception as e:
         print(f"Error querying subreddit: {e}")
         return json_response(500, {'error': 'Failed to fetch subreddit data'})
 
-    # Sort by total mentions (comments + threads)
-    sorted_tickers = sorted(
-        ticker_data.items(),
-        key=lambda x: x[1]['comments'] + x[1]['threads'],
-        reverse=True
-    )[:20]
-
-    top_tickers = [
-        {
-            'ticker': ticker,
-            'comments': data['comments'],
-            'threads': data['threads']
-        }
-        for ticker, data in sorted_tickers
-    ]
-
     return json_response(200, {
         'subreddit': name,
         'period': period,
-        'top_tickers': top_tickers
+        'top_tickers': top_ticker_rows((comments, threads), 20)
     })
 
 
+# API Gateway v2 routeKey -> handler(event)
+ROUTES = {
+    'GET /trending': handle_trending,
+    'GET /ticker/{symbol}': lambda event: handle_ticker(
+        event, (event.get('pathParameters') or {}).get('symbol', '')
+    ),
+    'GET /subreddit/{name}': lambda event: handle_subreddit(
+        event, (event.get('pathParameters') or {}).get('name', '')
+    ),
+}
+
+
 def lambda_handler(event, context):
     """Main Lambda handler - routes API requests."""
-    print(f"Received event: {json.dumps(event)}")
-
-    # Extract route info from API Gateway v2 format
-    route_key = event.get('routeKey', '')
-    path_params = event.get('pathParameters', {}) or {}
+    if _DEBUG:
+        print(f"Received event: {json.dumps(event)}")
 
     # Route to appropriate handler
-    if route_key == 'GET /trending':
-        return handle_trending(event)
+    handler = ROUTES.get(event.get('routeKey', ''))
+    if handler is None:
+        return json_response(404, {'error': 'Not found'})
 
-    elif route_key == 'GET /ticker/{symbol}':
-        symbol = path_params.get('symbol', '')
-        return handle_ticker(event, symbol)
+    response = handler(event)
 
-    elif route_key == 'GET /subreddit/{name}':
-        name = path_params.get('name', '')
-        return handle_subreddit(event, name)
+    if accepts_gzip(event):
+        response = gzip_response(response)
 
-    else:
-        return json_response(404, {'error': 'Not found'})
+    return response
@@ -6,24 +6,135 @@ Processes Reddit posts from SQS, extracts ticker mentions, and stores in DynamoD
 import os
 import re
 import json
+import time
 import boto3
+import pickle
+import ahocorasick
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-dynamodb = boto3.resource('dynamodb')
+# Keep connections to DynamoDB alive across warm invocations; botocore
+# already disables Nagle (TCP_NODELAY) on its connections
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'adaptive'}
+)
+
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
 stocks_table = dynamodb.Table(os.environ['STOCKS_TABLE'])
-mentions_table = dynamodb.Table(os.environ['MENTIONS_TABLE'])
+
+# Mentions are written pre-serialized through the low-level client,
+# skipping the resource layer's per-item TypeSerializer pass
+dynamodb_client = boto3.client('dynamodb', config=BOTO_CONFIG)
+MENTIONS_TABLE = os.environ['MENTIONS_TABLE']
+
+# BatchExecuteStatement runs at most 25 statements per request
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_RETRIES = 5
+
+# Counter tables by partition key attribute. Counters are updated in
+# parallel (within botocore's default 10 pooled connections), so through
+# the (thread-safe) client.
+COUNTER_TABLES = {
+    'period_bucket': os.environ['TRENDING_COUNTS_TABLE'],
+    'subreddit_bucket': os.environ['SUBREDDIT_TRENDING_COUNTS_TABLE']
+}
+COUNTER_UPDATE_WORKERS = 10
+
+# Per-request logging is only emitted with LOG_LEVEL=DEBUG
+_DEBUG = os.environ.get('LOG_LEVEL', 'INFO') == 'DEBUG'
 
 # Cache for valid tickers (loaded once per Lambda instance)
 VALID_TICKERS = None
 
+# Stocks table row holding every ticker as a string set (written by stock-sync)
+ALL_TICKERS_KEY = '__ALL__'
+
+# Aho-Corasick automatons over VALID_TICKERS (built once per Lambda instance)
+TICKER_AUTOMATONS = None
+
+# Tickers and automatons persisted to /tmp, which survives cold starts that
+# land on a reused execution environment
+TICKER_CACHE_PATH = '/tmp/tickers.pkl'
+TICKER_CACHE_MAX_AGE_SECONDS = 3600
+
+# Tickers that can be matched (1-5 uppercase letters)
+TICKER_SYMBOL_RE = re.compile(r'[A-Z]{1,5}')
+
+# Plain tickers need at least two consecutive uppercase letters
+UPPERCASE_PAIR_RE = re.compile(r'[A-Z]{2}')
+
+
+def read_ticker_cache():
+    """
+    Read (valid tickers, automatons) from the /tmp cache.
+    Returns None if the cache is missing, stale, or unreadable.
+    """
+    try:
+        if time.time() - os.path.getmtime(TICKER_CACHE_PATH) > TICKER_CACHE_MAX_AGE_SECONDS:
+            return None
+
+        with open(TICKER_CACHE_PATH, 'rb') as f:
+            valid_tickers, automatons = pickle.load(f)
+
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading ticker cache: {e}")
+        return None
+
+    # Sanity check against a truncated or partial cache
+    if not valid_tickers or len(automatons[1]) == 0:
+        return None
+
+    return valid_tickers, automatons
+
+
+def write_ticker_cache(valid_tickers, automatons):
+    """Write (valid tickers, automatons) to the /tmp cache atomically."""
+    tmp_path = f"{TICKER_CACHE_PATH}.{os.getpid()}"
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((valid_tickers, automatons), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, TICKER_CACHE_PATH)
+    except Exception as e:
+        print(f"Error writing ticker cache: {e}")
+
 
 def load_valid_tickers():
-    """Load all valid tickers from DynamoDB."""
-    global VALID_TICKERS
+    """
+    Load all valid tickers from DynamoDB.
+    Uses the /tmp cache when fresh, otherwise reads the aggregate ticker
+    list row written by stock-sync in one get_item, falling back to
+    scanning the stocks table.
+    """
+    global VALID_TICKERS, TICKER_AUTOMATONS
 
     if VALID_TICKERS is not None:
         return VALID_TICKERS
 
+    cached = read_ticker_cache()
+    if cached:
+        VALID_TICKERS, TICKER_AUTOMATONS = cached
+        print(f"Loaded {len(VALID_TICKERS)} valid tickers from {TICKER_CACHE_PATH}")
+        return VALID_TICKERS
+
+    try:
+        response = stocks_table.get_item(
+            Key={'ticker': ALL_TICKERS_KEY},
+            ProjectionExpression='tickers'
+        )
+        VALID_TICKERS = set(response['Item']['tickers'])
+        print(f"Loaded {len(VALID_TICKERS)} valid tickers from {ALL_TICKERS_KEY}")
+        return VALID_TICKERS
+
+    except KeyError:
+        print(f"No {ALL_TICKERS_KEY} ticker list found, scanning stocks table")
+    except Exception as e:
+        print(f"Error reading {ALL_TICKERS_KEY} ticker list: {e}")
+
     VALID_TICKERS = set()
 
     try:
@@ -44,6 +155,7 @@ def load_valid_tickers():
             for item in response.get('Items', []):
                 VALID_TICKERS.add(item['ticker'])
 
+        VALID_TICKERS.discard(ALL_TICKERS_KEY)
         print(f"Loaded {len(VALID_TICKERS)} valid tickers")
 
     except Exception as e:
@@ -52,79 +164,246 @@ def load_valid_tickers():
     return VALID_TICKERS
 
 
-def extract_tickers(text, valid_tickers):
+def build_ticker_automatons(valid_tickers):
+    """
+    Build Aho-Corasick automatons matching only known tickers.
+    Returns: (dollar automaton for "$TICKER", plain automaton for "TICKER")
+    """
+    dollar_automaton = ahocorasick.Automaton()
+    plain_automaton = ahocorasick.Automaton()
+
+    for ticker in valid_tickers:
+        if not TICKER_SYMBOL_RE.fullmatch(ticker):
+            continue
+
+        dollar_automaton.add_word(f'${ticker}', ticker)
+        if len(ticker) >= 2:
+            plain_automaton.add_word(ticker, ticker)
+
+    dollar_automaton.make_automaton()
+    plain_automaton.make_automaton()
+
+    return dollar_automaton, plain_automaton
+
+
+def get_ticker_automatons(valid_tickers):
+    """Get the ticker automatons, building (and caching to /tmp) on first use."""
+    global TICKER_AUTOMATONS
+
+    if TICKER_AUTOMATONS is None:
+        TICKER_AUTOMATONS = build_ticker_automatons(valid_tickers)
+        write_ticker_cache(valid_tickers, TICKER_AUTOMATONS)
+
+    return TICKER_AUTOMATONS
+
+
+def is_word_char(text, index):
+    """True if text[index] exists and is a regex word character (\\w)."""
+    if index < 0 or index >= len(text):
+        return False
+    char = text[index]
+    return char.isalnum() or char == '_'
+
+
+def extract_tickers(text, automatons):
     """
     Extract stock tickers from text.
     Matches:
     - $AAPL format
-    - AAPL (uppercase, 1-5 chars, word boundary)
+    - AAPL (uppercase, 2-5 chars, word boundary)
+
+    Each automaton only reports known tickers, so the text is scanned once
+    per format with word boundaries checked around each hit. Text that
+    can't contain either format is skipped without scanning.
     """
+    has_dollar = '$' in text
+    has_uppercase_pair = UPPERCASE_PAIR_RE.search(text) is not None
+
+    if not has_dollar and not has_uppercase_pair:
+        return []
+
+    dollar_automaton, plain_automaton = automatons
     found_tickers = set()
 
-    # Pattern for $TICKER format (most reliable)
-    dollar_pattern = r'\$([A-Z]{1,5})\b'
-    for match in re.finditer(dollar_pattern, text.upper()):
-        ticker = match.group(1)
-        if ticker in valid_tickers:
-            found_tickers.add(ticker)
-
-    # Pattern for plain TICKER format (uppercase words)
-    # More strict - must be uppercase in original text
-    plain_pattern = r'\b([A-Z]{2,5})\b'
-    for match in re.finditer(plain_pattern, text):
-        ticker = match.group(1)
-        if ticker in valid_tickers:
-            found_tickers.add(ticker)
+    # $TICKER format (most reliable) - case-insensitive, so scan uppercased text
+    if has_dollar and dollar_automaton.kind == ahocorasick.AHOCORASICK:
+        text_upper = text.upper()
+        for end_index, ticker in dollar_automaton.iter(text_upper):
+            if not is_word_char(text_upper, end_index + 1):
+                found_tickers.add(ticker)
+
+    # Plain TICKER format - must be uppercase in original text
+    if has_uppercase_pair and plain_automaton.kind == ahocorasick.AHOCORASICK:
+        for end_index, ticker in plain_automaton.iter(text):
+            start_index = end_index - len(ticker) + 1
+            if not is_word_char(text, start_index - 1) and not is_word_char(text, end_index + 1):
+                found_tickers.add(ticker)
 
     return list(found_tickers)
 
 
-def store_mention(ticker, post_data):
-    """Store a ticker mention in DynamoDB."""
+def mention_sort_key(post_data):
+    """Sort key format: timestamp#post_id or timestamp#comment_id"""
     timestamp = datetime.fromtimestamp(
         post_data['created_utc'],
         tz=timezone.utc
     ).isoformat()
 
+    is_comment = post_data.get('is_comment', False)
+    item_id = post_data.get('comment_id') if is_comment else post_data['post_id']
+    return f"{timestamp}#{item_id}"
+
+
+def build_mention_item(ticker, post_data, sort_key):
+    """Build a mention item in DynamoDB wire format."""
     # Determine source type
     is_comment = post_data.get('is_comment', False)
+
+    item = {
+        'ticker': {'S': ticker},
+        'timestamp_post_id': {'S': sort_key},
+        'subreddit': {'S': post_data['subreddit']},
+        'post_id': {'S': post_data['post_id']},
+        'author': {'S': post_data['author']},
+        'upvotes': {'N': str(post_data['upvotes'])},
+        'url': {'S': post_data['url']},
+        'created_utc': {'N': str(int(post_data['created_utc']))},
+        'source_type': {'S': 'comment' if is_comment else 'post'},
+        # bucket-timestamp-index
+        'bucket': {'S': datetime.fromtimestamp(post_data['created_utc'], tz=timezone.utc).strftime('%Y-%m-%dT%H')}
+    }
     
-    # Sort key format: timestamp#post_id or timestamp#comment_id
-    item_id = post_data.get('comment_id') if is_comment else post_data['post_id']
-    sort_key = f"{timestamp}#{item_id}"
+    # Add type-specific fields
+    if is_comment:
+        item['comment_id'] = {'S': post_data['comment_id']}
+        item['comment_body'] = {'S': post_data.get('body', '')}
+        item['parent_id'] = {'S': post_data.get('parent_id', '')}
+    else:
+        item['post_title'] = {'S': post_data.get('title', '')}
+        item['post_body'] = {'S': post_data.get('selftext', '')}
+    
+    return item
+
+
+def insert_statement(item):
+    """PartiQL INSERT for a mention, which fails with DuplicateItem rather than overwriting."""
+    names = list(item)
+    value = ', '.join(f"'{name}': ?" for name in names)
+    return {
+        'Statement': f'INSERT INTO "{MENTIONS_TABLE}" VALUE {{{value}}}',
+        'Parameters': [item[name] for name in names]
+    }
+
+
+def write_mentions(items):
+    """
+    Insert mention items with BatchExecuteStatement, 25 per request,
+    retrying failed statements with exponential backoff. Mentions already
+    stored (e.g. by an earlier delivery of the same message) are left as
+    they are.
+    Returns (newly inserted, unwritten) items.
+    """
+    inserted = []
+    unwritten = []
+
+    for i in range(0, len(items), BATCH_WRITE_SIZE):
+        pending = items[i:i + BATCH_WRITE_SIZE]
+
+        try:
+            for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+                response = dynamodb_client.batch_execute_statement(
+                    Statements=[insert_statement(item) for item in pending]
+                )
+
+                failed = []
+                for item, result in zip(pending, response['Responses']):
+                    error = result.get('Error')
+                    if error is None:
+                        inserted.append(item)
+                    elif error.get('Code') != 'DuplicateItem':
+                        failed.append(item)
+
+                pending = failed
+                if not pending:
+                    break
+                if attempt < BATCH_WRITE_MAX_RETRIES:
+                    time.sleep(0.05 * 2 ** attempt)
+
+        except Exception as e:
+            print(f"Error in batch write: {e}")
 
+        unwritten.extend(pending)
+
+    return inserted, unwritten
+
+
+def get_time_buckets(created_utc):
+    """Get the hourly and daily trending-count buckets for a timestamp."""
+    dt = datetime.fromtimestamp(created_utc, tz=timezone.utc)
+    return [dt.strftime('%Y-%m-%dT%H'), dt.strftime('%Y-%m-%d')]
+
+
+def update_trending_counts(items):
+    """
+    Add newly stored mentions to the pre-aggregated trending counters
+    (overall and per-subreddit). Deltas are summed per counter key so
+    each counter is updated once per invocation, and the updates run in
+    parallel.
+    Returns the number of counter updates that failed.
+    """
+    deltas = {}  # (key_name, bucket, ticker) -> {comments, threads}
+
+    for item in items:
+        ticker = item['ticker']['S']
+        subreddit = item['subreddit']['S']
+        counter = 'comments' if item['source_type']['S'] == 'comment' else 'threads'
+
+        for bucket in get_time_buckets(int(item['created_utc']['N'])):
+            for key in (
+                ('period_bucket', bucket, ticker),
+                ('subreddit_bucket', f"{subreddit}#{bucket}", ticker)
+            ):
+                if key not in deltas:
+                    deltas[key] = {'comments': 0, 'threads': 0}
+                deltas[key][counter] += 1
+
+    if not deltas:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=COUNTER_UPDATE_WORKERS) as executor:
+        failed = sum(not ok for ok in executor.map(add_trending_counts, deltas.keys(), deltas.values()))
+
+    if failed:
+        # The mentions are stored, so a redelivery won't count them again;
+        # run scripts/backfill_trending_counts.py to correct the counters
+        print(f"Error: {failed} of {len(deltas)} trending counter updates failed")
+
+    return failed
+
+
+def add_trending_counts(key, counts):
+    """Add comment/thread deltas to one counter. Returns False if the update failed."""
+    key_name, bucket, ticker = key
     try:
-        item = {
-            'ticker': ticker,
-            'timestamp_post_id': sort_key,
-            'subreddit': post_data['subreddit'],
-            'post_id': post_data['post_id'],
-            'author': post_data['author'],
-            'upvotes': post_data['upvotes'],
-            'url': post_data['url'],
-            'created_utc': int(post_data['created_utc']),
-            'source_type': 'comment' if is_comment else 'post'
-        }
-        
-        # Add type-specific fields
-        if is_comment:
-            item['comment_id'] = post_data['comment_id']
-            item['comment_body'] = post_data.get('body', '')
-            item['parent_id'] = post_data.get('parent_id', '')
-        else:
-            item['post_title'] = post_data.get('title', '')
-            item['post_body'] = post_data.get('selftext', '')
-        
-        mentions_table.put_item(Item=item)
+        dynamodb_client.update_item(
+            TableName=COUNTER_TABLES[key_name],
+            Key={key_name: {'S': bucket}, 'ticker': {'S': ticker}},
+            UpdateExpression='ADD comments :c, threads :t',
+            ExpressionAttributeValues={
+                ':c': {'N': str(counts['comments'])},
+                ':t': {'N': str(counts['threads'])}
+            }
+        )
         return True
     except Exception as e:
-        print(f"Error storing mention for {ticker}: {e}")
+        print(f"Error updating trending counts for {ticker} ({bucket}): {e}")
         return False
 
 
 def lambda_handler(event, context):
     """Main Lambda handler - triggered by SQS."""
-    print(f"Processing {len(event['Records'])} SQS messages")
+    if _DEBUG:
+        print(f"Processing {len(event['Records'])} SQS messages")
 
     # Load valid tickers
     valid_tickers = load_valid_tickers()
@@ -133,7 +412,12 @@ def lambda_handler(event, context):
         print("Warning: No valid tickers loaded, skipping processing")
         return {'statusCode': 200, 'body': 'No tickers loaded'}
 
-    total_mentions = 0
+    automatons = get_ticker_automatons(valid_tickers)
+
+    # SQS delivers at least once, so the same post/comment can appear more
+    # than once per batch; BatchWriteItem also rejects duplicate keys
+    stored_items = []
+    seen = set()  # (ticker, sort key)
     processed_posts = 0
 
     for record in event['Records']:
@@ -143,7 +427,7 @@ def lambda_handler(event, context):
 
             # Determine what text to scan
             is_comment = post_data.get('is_comment', False)
-            
+
             if is_comment:
                 # For comments, scan the comment body
                 text_to_scan = post_data.get('body', '')
@@ -156,19 +440,36 @@ def lambda_handler(event, context):
                 preview = post_data.get('title', '')[:50]
 
             # Extract tickers
-            tickers = extract_tickers(text_to_scan, valid_tickers)
+            tickers = extract_tickers(text_to_scan, automatons)
 
             if tickers:
-                source = "comment" if is_comment else "post"
-                print(f"Found tickers {tickers} in {source}: {preview}...")
+                if _DEBUG:
+                    source = "comment" if is_comment else "post"
+                    print(f"Found tickers {tickers} in {source}: {preview}...")
+
+                sort_key = mention_sort_key(post_data)
 
                 for ticker in tickers:
-                    if store_mention(ticker, post_data):
-                        total_mentions += 1
+                    if (ticker, sort_key) in seen:
+                        continue
+                    seen.add((ticker, sort_key))
+                    stored_items.append(build_mention_item(ticker, post_data, sort_key))
 
         except Exception as e:
             print(f"Error processing record: {e}")
 
+    inserted_items, unwritten_items = write_mentions(stored_items)
+
+    # Counted even if some writes failed: a redelivery skips the mentions
+    # already inserted, so they wouldn't be counted later
+    update_trending_counts(inserted_items)
+
+    if unwritten_items:
+        # Let SQS redeliver the batch
+        raise RuntimeError(f"{len(unwritten_items)} mentions not written after {BATCH_WRITE_MAX_RETRIES} retries")
+
+    total_mentions = len(inserted_items)
+
     print(f"Processed {processed_posts} posts, stored {total_mentions} mentions")
 
     return {
@@ -4,19 +4,111 @@ Fetches new posts from target subreddits and sends them to SQS for processing.
 """
 
 import os
-import json
+import time
+import uuid
+import queue
+import threading
 import boto3
 import praw
+import orjson
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from botocore.config import Config
+
+TARGET_SUBREDDITS = os.environ['TARGET_SUBREDDITS'].split(',')
+
+# Concurrent comment fetches per subreddit. Kept small: PRAW still
+# rate-limits requests, this just overlaps their network latency (bounded
+# by the client pool).
+COMMENT_FETCH_WORKERS = 8
+
+# Reddit clients shared by the subreddit and comment threads; caps
+# concurrent Reddit requests across all of them
+REDDIT_CLIENTS = int(os.environ.get('REDDIT_CLIENTS', '8'))
+
+# Reddit HTTP requests per minute, across all threads
+REDDIT_REQUESTS_PER_MINUTE = int(os.environ.get('REDDIT_REQUESTS_PER_MINUTE', '100'))
+
+# Concurrent SQS batch sends per subreddit
+SQS_SEND_WORKERS = 10
+SQS_SEND_MAX_RETRIES = 3
+
+# Connections that may be in use at once across the subreddit threads
+MAX_POOL_CONNECTIONS = len(TARGET_SUBREDDITS) * max(COMMENT_FETCH_WORKERS, SQS_SEND_WORKERS)
+
+# Keep connections alive across warm invocations
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={'max_attempts': 5, 'mode': 'adaptive'}
+)
 
 # AWS clients
-ssm = boto3.client('ssm')
-sqs = boto3.client('sqs')
-dynamodb = boto3.resource('dynamodb')
+ssm = boto3.client('ssm', config=BOTO_CONFIG)
+sqs = boto3.client('sqs', config=BOTO_CONFIG)
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
 
-metadata_table = dynamodb.Table(os.environ['METADATA_TABLE'])
+METADATA_TABLE = os.environ['METADATA_TABLE']
+metadata_table = dynamodb.Table(METADATA_TABLE)
 SQS_QUEUE_URL = os.environ['SQS_QUEUE_URL']
-TARGET_SUBREDDITS = os.environ['TARGET_SUBREDDITS'].split(',')
+
+# Prefix for permalinks
+REDDIT_BASE_URL = 'https://reddit.com'
+
+# Last fetch timestamps by subreddit, kept across warm invocations. Only one
+# fetcher (this function or the EC2 worker) runs at a time, so the table is
+# only read for subreddits this container hasn't seen yet.
+_LAST_FETCH_CACHE = {}
+
+# Reddit client pool (and the credentials it was built from) reused across
+# warm invocations; PRAW also keeps each client's OAuth token. Rebuilt
+# after the TTL so rotated credentials are picked up.
+CREDENTIALS_TTL_SECONDS = 3600
+_REDDIT_CLIENTS = {'at': 0, 'pool': None}
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by the fetch threads."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.fill_rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until it is available if the bucket is empty."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+
+            # Reserve the token even when it isn't available yet, so waiting
+            # threads are spaced out instead of all waking at once
+            self.tokens -= 1
+            wait_seconds = -self.tokens / self.fill_rate if self.tokens < 0 else 0
+
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+
+reddit_rate_limiter = RateLimiter(REDDIT_REQUESTS_PER_MINUTE)
+
+
+class RateLimitedSession(requests.Session):
+    """HTTP session for PRAW that takes a rate limiter token for every request."""
+
+    def __init__(self, rate_limiter):
+        super().__init__()
+        self.rate_limiter = rate_limiter
+
+    def request(self, *args, **kwargs):
+        self.rate_limiter.acquire()
+        return super().request(*args, **kwargs)
 
 
 def get_reddit_credentials():
@@ -37,19 +129,87 @@ def get_reddit_credentials():
     }
 
 
-def get_last_fetch_time(subreddit):
-    """Get the last fetch timestamp for a subreddit."""
-    try:
-        response = metadata_table.get_item(
-            Key={'key': f'last_fetch_{subreddit}'}
-        )
-        if 'Item' in response:
-            return float(response['Item']['timestamp'])
-    except Exception as e:
-        print(f"Error getting last fetch time for {subreddit}: {e}")
+def create_reddit_client(creds):
+    """Create a read-only Reddit client whose requests go through the shared rate limiter."""
+    reddit = praw.Reddit(
+        client_id=creds['client_id'],
+        client_secret=creds['client_secret'],
+        user_agent='stock-mentions:v1.0 (by /u/stock-mentions-bot)',
+        requestor_kwargs={'session': RateLimitedSession(reddit_rate_limiter)}
+    )
+    reddit.read_only = True
+
+    return reddit
+
+
+class RedditClientPool:
+    """
+    Fixed set of Reddit clients, each checked out by one thread at a time.
+    PRAW instances aren't thread-safe, so threads never share one.
+    """
+
+    def __init__(self, size):
+        creds = get_reddit_credentials()
+        self.clients = queue.Queue()
+        for _ in range(size):
+            self.clients.put(create_reddit_client(creds))
+
+    @contextmanager
+    def client(self):
+        """Check out a client, waiting for one to be returned if all are in use."""
+        reddit = self.clients.get()
+        try:
+            yield reddit
+        finally:
+            self.clients.put(reddit)
+
+
+def get_reddit_pool():
+    """Get the shared Reddit client pool, creating it when missing or expired."""
+    if _REDDIT_CLIENTS['pool'] is None or time.time() - _REDDIT_CLIENTS['at'] > CREDENTIALS_TTL_SECONDS:
+        _REDDIT_CLIENTS.update(at=time.time(), pool=RedditClientPool(REDDIT_CLIENTS))
 
+    return _REDDIT_CLIENTS['pool']
+
+
+def get_last_fetch_times(subreddits):
+    """
+    Get the last fetch timestamps for all subreddits.
+    Timestamps not already cached by this container are read in one BatchGetItem.
+    Returns: {subreddit: timestamp}
+    """
     # Default to 1 hour ago if no previous fetch
-    return datetime.now(timezone.utc).timestamp() - 3600
+    default = datetime.now(timezone.utc).timestamp() - 3600
+
+    missing = [subreddit for subreddit in subreddits if subreddit not in _LAST_FETCH_CACHE]
+    if missing:
+        load_last_fetch_times(missing)
+
+    return {subreddit: _LAST_FETCH_CACHE.get(subreddit, default) for subreddit in subreddits}
+
+
+def load_last_fetch_times(subreddits):
+    """Read last fetch timestamps into the in-memory cache with BatchGetItem."""
+    request_items = {
+        METADATA_TABLE: {
+            'Keys': [{'key': f'last_fetch_{subreddit}'} for subreddit in subreddits],
+            'ProjectionExpression': '#k, #ts',
+            'ExpressionAttributeNames': {'#k': 'key', '#ts': 'timestamp'}
+        }
+    }
+
+    try:
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+
+            for item in response['Responses'].get(METADATA_TABLE, []):
+                subreddit = item['key'][len('last_fetch_'):]
+                _LAST_FETCH_CACHE[subreddit] = float(item['timestamp'])
+
+            request_items = response.get('UnprocessedKeys')
+
+    except Exception as e:
+        print(f"Error getting last fetch times: {e}")
 
 
 def set_last_fetch_time(subreddit, timestamp):
@@ -60,122 +220,222 @@ def set_last_fetch_time(subreddit, timestamp):
             'timestamp': str(timestamp),
             'updated_at': datetime.now(timezone.utc).isoformat()
         })
+        _LAST_FETCH_CACHE[subreddit] = timestamp
     except Exception as e:
         print(f"Error setting last fetch time for {subreddit}: {e}")
 
 
-def send_to_sqs(posts):
-    """Send posts to SQS queue in batches."""
-    # SQS batch limit is 10 messages
-    for i in range(0, len(posts), 10):
-        batch = posts[i:i+10]
-        entries = [
-            {
-                'Id': str(idx),
-                'MessageBody': json.dumps(post)
-            }
-            for idx, post in enumerate(batch)
-        ]
+def send_sqs_batch(entries):
+    """Send one SQS batch, retrying failed entries with exponential backoff."""
+    if not entries:
+        return
 
+    for attempt in range(SQS_SEND_MAX_RETRIES + 1):
         try:
-            sqs.send_message_batch(
+            response = sqs.send_message_batch(
                 QueueUrl=SQS_QUEUE_URL,
                 Entries=entries
             )
+
+            failed_ids = {failure['Id'] for failure in response.get('Failed', [])}
+            entries = [entry for entry in entries if entry['Id'] in failed_ids]
+            if not entries:
+                return
+
         except Exception as e:
             print(f"Error sending batch to SQS: {e}")
 
+        if attempt < SQS_SEND_MAX_RETRIES:
+            time.sleep(0.1 * 2 ** attempt)
 
-def lambda_handler(event, context):
-    """Main Lambda handler."""
-    print(f"Starting Reddit fetch for subreddits: {TARGET_SUBREDDITS}")
+    print(f"Failed to send {len(entries)} messages to SQS")
 
-    # Get Reddit credentials
-    creds = get_reddit_credentials()
 
-    # Initialize PRAW
-    reddit = praw.Reddit(
-        client_id=creds['client_id'],
-        client_secret=creds['client_secret'],
-        user_agent='stock-mentions:v1.0 (by /u/stock-mentions-bot)'
-    )
-    reddit.read_only = True
+def send_to_sqs(posts):
+    """Send posts to SQS queue in batches, sending batches in parallel."""
+    # SQS batch limit is 10 messages
+    batches = [
+        [
+            {
+                'Id': uuid.uuid4().hex,  # Unique across batches and retries
+                'MessageBody': orjson.dumps(post).decode('utf-8')
+            }
+            for post in posts[i:i+10]
+        ]
+        for i in range(0, len(posts), 10)
+    ]
 
-    total_posts = 0
+    with ThreadPoolExecutor(max_workers=SQS_SEND_WORKERS) as executor:
+        list(executor.map(send_sqs_batch, batches))
 
-    for subreddit_name in TARGET_SUBREDDITS:
-        print(f"Fetching from r/{subreddit_name}")
 
-        last_fetch = get_last_fetch_time(subreddit_name)
-        latest_timestamp = last_fetch
-        posts_to_send = []
+def flatten_comment_listing(listing):
+    """
+    Flatten a raw comment listing breadth-first (the same order as PRAW's
+    comments.list()), dropping "load more" stubs.
+    """
+    comments = []
+    queue = deque(listing['data']['children'])
 
-        try:
-            subreddit = reddit.subreddit(subreddit_name)
+    while queue:
+        child = queue.popleft()
+        if child['kind'] != 't1':
+            continue
+
+        comments.append(child['data'])
 
-            for submission in subreddit.new(limit=100):
-                # Skip posts older than last fetch
-                if submission.created_utc <= last_fetch:
-                    continue
+        replies = child['data'].get('replies')
+        if replies:
+            queue.extend(replies['data']['children'])
 
-                # Track latest timestamp
-                if submission.created_utc > latest_timestamp:
-                    latest_timestamp = submission.created_utc
+    return comments
+
+
+def fetch_comments(pool, submission_id, subreddit_name, last_fetch):
+    """
+    Fetch new comments for a submission (max 50).
+    Reads the raw comments JSON in one request rather than hydrating
+    PRAW comment objects.
+    """
+    comments = []
+
+    try:
+        with pool.client() as reddit:
+            response = reddit.request(
+                method='GET',
+                path=f'comments/{submission_id}/',
+                params={'limit': 50, 'sort': 'new'}
+            )
+
+        for comment in flatten_comment_listing(response[1])[:50]:  # Limit to 50 comments per post
+            if comment['created_utc'] <= last_fetch:
+                continue
+
+            comment_data = {
+                'post_id': submission_id,
+                'comment_id': comment['id'],
+                'subreddit': subreddit_name,
+                'parent_type': 'post',
+                'parent_id': submission_id,
+                'body': comment['body'],
+                'author': comment.get('author') or '[deleted]',
+                'upvotes': comment['score'],
+                'url': REDDIT_BASE_URL + comment['permalink'],
+                'created_utc': comment['created_utc'],
+                'is_comment': True
+            }
+            comments.append(comment_data)
+
+    except Exception as e:
+        print(f"Error fetching comments for {submission_id}: {e}")
+
+    return comments
+
+
+def fetch_subreddit(pool, subreddit_name, last_fetch, metadata_writer, pending_writes):
+    """
+    Fetch new posts and their comments from a subreddit and send them to SQS.
+    Comment trees are fetched in parallel, each thread checking out its own
+    client from the pool. The last fetch time update is
+    submitted to metadata_writer and its future appended to pending_writes.
+    Returns the number of items sent.
+    """
+    print(f"Fetching from r/{subreddit_name}")
+
+    latest_timestamp = last_fetch
+    posts_to_send = []
+    comments_count = 0
+
+    try:
+        # The client is returned before the comment fetches check out theirs
+        with pool.client() as reddit:
+            listing = list(reddit.subreddit(subreddit_name).new(limit=100))
+
+        submissions = []
+        for submission in listing:
+            # Skip posts older than last fetch
+            if submission.created_utc <= last_fetch:
+                continue
+
+            # Track latest timestamp
+            if submission.created_utc > latest_timestamp:
+                latest_timestamp = submission.created_utc
+
+            submissions.append(submission)
+
+        # Fetch top-level comments (limit to avoid rate limits)
+        with ThreadPoolExecutor(max_workers=COMMENT_FETCH_WORKERS) as executor:
+            all_comments = executor.map(
+                lambda submission: fetch_comments(pool, submission.id, subreddit_name, last_fetch),
+                submissions
+            )
+
+            for submission, comments in zip(submissions, all_comments):
+                # .name is set from the listing, so reading it never fetches the Redditor
+                author = submission.author
 
                 post_data = {
                     'post_id': submission.id,
                     'subreddit': subreddit_name,
                     'title': submission.title,
                     'selftext': submission.selftext or '',  # Post body
-                    'author': str(submission.author) if submission.author else '[deleted]',
+                    'author': author.name if author is not None else '[deleted]',
                     'upvotes': submission.score,
-                    'url': f'https://reddit.com{submission.permalink}',
+                    'url': REDDIT_BASE_URL + submission.permalink,
                     'created_utc': submission.created_utc,
                     'num_comments': submission.num_comments
                 }
 
                 posts_to_send.append(post_data)
+                posts_to_send.extend(comments)
+                comments_count += len(comments)
 
-                # Fetch top-level comments (limit to avoid rate limits)
-                try:
-                    submission.comments.replace_more(limit=0)  # Don't fetch "load more" comments
-                    for comment in submission.comments.list()[:50]:  # Limit to 50 comments per post
-                        if comment.created_utc <= last_fetch:
-                            continue
-
-                        comment_data = {
-                            'post_id': submission.id,
-                            'comment_id': comment.id,
-                            'subreddit': subreddit_name,
-                            'parent_type': 'post',
-                            'parent_id': submission.id,
-                            'body': comment.body,
-                            'author': str(comment.author) if comment.author else '[deleted]',
-                            'upvotes': comment.score,
-                            'url': f'https://reddit.com{comment.permalink}',
-                            'created_utc': comment.created_utc,
-                            'is_comment': True
-                        }
-                        posts_to_send.append(comment_data)
-
-                except Exception as e:
-                    print(f"Error fetching comments for {submission.id}: {e}")
-
-            # Count posts vs comments
-            posts_count = sum(1 for item in posts_to_send if not item.get('is_comment'))
-            comments_count = sum(1 for item in posts_to_send if item.get('is_comment'))
-            print(f"Found {posts_count} new posts and {comments_count} comments in r/{subreddit_name}")
-
-            if posts_to_send:
-                send_to_sqs(posts_to_send)
-                total_posts += len(posts_to_send)
-
-            # Update last fetch time
-            if latest_timestamp > last_fetch:
-                set_last_fetch_time(subreddit_name, latest_timestamp)
+        posts_count = len(submissions)
+        print(f"Found {posts_count} new posts and {comments_count} comments in r/{subreddit_name}")
 
-        except Exception as e:
-            print(f"Error fetching from r/{subreddit_name}: {e}")
+        if posts_to_send:
+            send_to_sqs(posts_to_send)
+
+        # Update last fetch time
+        if latest_timestamp > last_fetch:
+            pending_writes.append(metadata_writer.submit(set_last_fetch_time, subreddit_name, latest_timestamp))
+
+        return len(posts_to_send)
+
+    except Exception as e:
+        print(f"Error fetching from r/{subreddit_name}: {e}")
+        return 0
+
+
+def lambda_handler(event, context):
+    """Main Lambda handler."""
+    print(f"Starting Reddit fetch for subreddits: {TARGET_SUBREDDITS}")
+
+    # The SSM credentials and last fetch time reads are independent; overlap them
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pool_future = executor.submit(get_reddit_pool)
+        last_fetch_future = executor.submit(get_last_fetch_times, TARGET_SUBREDDITS)
+
+    pool = pool_future.result()
+    last_fetch_times = last_fetch_future.result()
+
+    # Last fetch time writes happen off the fetch path; they are waited
+    # on before returning so they persist before the invocation ends
+    metadata_writer = ThreadPoolExecutor(max_workers=4)
+    pending_writes = []
+
+    # Subreddits are fetched in parallel to overlap Reddit round-trips
+    with ThreadPoolExecutor(max_workers=len(TARGET_SUBREDDITS)) as executor:
+        total_posts = sum(executor.map(
+            lambda subreddit_name: fetch_subreddit(
+                pool, subreddit_name, last_fetch_times[subreddit_name],
+                metadata_writer, pending_writes
+            ),
+            TARGET_SUBREDDITS
+        ))
+
+    wait(pending_writes)
+    metadata_writer.shutdown()
 
     print(f"Total items (posts + comments) sent to SQS: {total_posts}")
 
@@ -3,16 +3,28 @@ Stock Sync Lambda
 Fetches NASDAQ and NYSE stock lists and stores them in DynamoDB.
 """
 
+import io
 import os
+import csv
+import sys
+import time
+import pickle
 import urllib.request
 import boto3
 from datetime import datetime, timezone
+from botocore.config import Config
 
-dynamodb = boto3.resource('dynamodb')
+# Keep connections alive across warm invocations
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    retries={'max_attempts': 5, 'mode': 'adaptive'}
+)
+
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
 stocks_table = dynamodb.Table(os.environ['STOCKS_TABLE'])
 
 # Common words that are also tickers - skip these to avoid false positives
-SKIP_TICKERS = {
+SKIP_TICKERS = frozenset(sys.intern(ticker) for ticker in {
     'A', 'I', 'AM', 'AN', 'AS', 'AT', 'BE', 'BY', 'DO', 'GO', 'HE', 'IF', 'IN',
     'IS', 'IT', 'ME', 'MY', 'NO', 'OF', 'OK', 'ON', 'OR', 'SO', 'TO', 'UP', 'US',
     'WE', 'ALL', 'AND', 'ANY', 'ARE', 'BIG', 'BUT', 'CAN', 'DAY', 'DID', 'FOR',
@@ -29,8 +41,27 @@ SKIP_TICKERS = {
     'WORK', 'YOLO', 'YOUR', 'ZERO', 'DD', 'CEO', 'CFO', 'IPO', 'ETF', 'GDP', 'USA',
     'LLC', 'INC', 'EPS', 'ATH', 'FUD', 'IMO', 'LOL', 'OMG', 'SEC', 'WSB', 'RH',
     'TD', 'TA', 'FA', 'PT', 'PM', 'ER'
+})
+
+# Map exchange codes
+EXCHANGE_MAP = {
+    'A': 'NYSE American',
+    'N': 'NYSE',
+    'P': 'NYSE Arca',
+    'Z': 'BATS',
+    'V': 'IEX'
 }
 
+# Row holding every ticker as a string set, so readers can load the full
+# list with one get_item instead of scanning the table
+ALL_TICKERS_KEY = '__ALL__'
+
+# Parsed stock lists are cached in memory and in /tmp. The feeds change at
+# most daily, so retries and re-runs within a day skip the FTP download.
+STOCKS_CACHE_PATH = '/tmp/stocks.pkl'
+STOCKS_CACHE_TTL_SECONDS = 86400
+_STOCKS_CACHE = {'ts': 0, 'stocks': None}
+
 NASDAQ_URL = 'ftp://ftp.nasdaqtrader.com/symboldirectory/nasdaqlisted.txt'
 OTHER_URL = 'ftp://ftp.nasdaqtrader.com/symboldirectory/otherlisted.txt'
 
@@ -40,15 +71,16 @@ def fetch_nasdaq_stocks():
     stocks = []
     try:
         with urllib.request.urlopen(NASDAQ_URL, timeout=30) as response:
-            content = response.read().decode('utf-8')
-            lines = content.strip().split('\n')
+            # Decode and parse line by line as the file streams in
+            text = io.TextIOWrapper(response, encoding='utf-8', newline='')
+            reader = csv.reader(text, delimiter='|', quoting=csv.QUOTE_NONE)
 
             # Skip header and footer
-            for line in lines[1:]:
-                if line.startswith('File Creation Time'):
+            next(reader, None)
+            for parts in reader:
+                if parts and parts[0].startswith('File Creation Time'):
                     break
 
-                parts = line.split('|')
                 if len(parts) >= 2:
                     ticker = parts[0].strip()
                     company_name = parts[1].strip()
@@ -71,29 +103,22 @@ def fetch_other_stocks():
     stocks = []
     try:
         with urllib.request.urlopen(OTHER_URL, timeout=30) as response:
-            content = response.read().decode('utf-8')
-            lines = content.strip().split('\n')
+            # Decode and parse line by line as the file streams in
+            text = io.TextIOWrapper(response, encoding='utf-8', newline='')
+            reader = csv.reader(text, delimiter='|', quoting=csv.QUOTE_NONE)
 
             # Skip header and footer
-            for line in lines[1:]:
-                if line.startswith('File Creation Time'):
+            next(reader, None)
+            for parts in reader:
+                if parts and parts[0].startswith('File Creation Time'):
                     break
 
-                parts = line.split('|')
                 if len(parts) >= 3:
                     ticker = parts[0].strip()
                     company_name = parts[1].strip()
                     exchange = parts[2].strip()
 
-                    # Map exchange codes
-                    exchange_map = {
-                        'A': 'NYSE American',
-                        'N': 'NYSE',
-                        'P': 'NYSE Arca',
-                        'Z': 'BATS',
-                        'V': 'IEX'
-                    }
-                    exchange_name = exchange_map.get(exchange, exchange)
+                    exchange_name = EXCHANGE_MAP.get(exchange, exchange)
 
                     if ticker and ticker not in SKIP_TICKERS:
                         stocks.append({
@@ -107,6 +132,54 @@ def fetch_other_stocks():
     return stocks
 
 
+def load_stocks_cache():
+    """Load the /tmp stocks cache into memory (if present)."""
+    try:
+        with open(STOCKS_CACHE_PATH, 'rb') as f:
+            ts, stocks = pickle.load(f)
+        _STOCKS_CACHE.update(ts=ts, stocks=stocks)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error reading stocks cache: {e}")
+
+
+def save_stocks_cache(stocks):
+    """Cache stock lists in memory and write them to /tmp atomically."""
+    ts = time.time()
+    _STOCKS_CACHE.update(ts=ts, stocks=stocks)
+
+    tmp_path = f"{STOCKS_CACHE_PATH}.{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((ts, stocks), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, STOCKS_CACHE_PATH)
+    except Exception as e:
+        print(f"Error writing stocks cache: {e}")
+
+
+def fetch_all_stocks():
+    """
+    Fetch NASDAQ and other exchange stocks, reusing a cached copy younger
+    than STOCKS_CACHE_TTL_SECONDS.
+    Returns: (nasdaq stocks, other stocks)
+    """
+    if _STOCKS_CACHE['stocks'] is None:
+        load_stocks_cache()
+
+    if _STOCKS_CACHE['stocks'] and time.time() - _STOCKS_CACHE['ts'] < STOCKS_CACHE_TTL_SECONDS:
+        print("Using cached stock lists")
+        return _STOCKS_CACHE['stocks']
+
+    stocks = (fetch_nasdaq_stocks(), fetch_other_stocks())
+
+    # A failed fetch returns an empty list; don't cache partial results
+    if all(stocks):
+        save_stocks_cache(stocks)
+
+    return stocks
+
+
 def batch_write_stocks(stocks):
     """Write stocks to DynamoDB in batches."""
     timestamp = datetime.now(timezone.utc).isoformat()
@@ -121,29 +194,38 @@ def batch_write_stocks(stocks):
             })
 
 
+def write_ticker_list(tickers):
+    """Write the aggregate ticker list row."""
+    # DynamoDB rejects empty sets; keep the previous list if both fetches failed
+    if not tickers:
+        return
+
+    stocks_table.put_item(Item={
+        'ticker': ALL_TICKERS_KEY,
+        'tickers': set(tickers),
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    })
+
+
 def lambda_handler(event, context):
     """Main Lambda handler."""
     print("Starting stock sync...")
 
     # Fetch from both sources
-    nasdaq_stocks = fetch_nasdaq_stocks()
+    nasdaq_stocks, other_stocks = fetch_all_stocks()
     print(f"Fetched {len(nasdaq_stocks)} NASDAQ stocks")
-
-    other_stocks = fetch_other_stocks()
     print(f"Fetched {len(other_stocks)} other exchange stocks")
 
-    # Combine and dedupe by ticker
-    all_stocks = {}
-    for stock in nasdaq_stocks + other_stocks:
-        ticker = stock['ticker']
-        if ticker not in all_stocks:
-            all_stocks[ticker] = stock
+    # Combine and dedupe by ticker (NASDAQ listing wins)
+    all_stocks = {stock['ticker']: stock for stock in other_stocks}
+    all_stocks.update((stock['ticker'], stock) for stock in nasdaq_stocks)
 
     stocks_list = list(all_stocks.values())
     print(f"Total unique stocks: {len(stocks_list)}")
 
     # Write to DynamoDB
     batch_write_stocks(stocks_list)
+    write_ticker_list(all_stocks)
     print("Stock sync complete")
 
     return {
@@ -5,16 +5,43 @@ Writes aggregated results to trends table for fast API queries.
 """
 
 import os
-import json
+import time
 import boto3
+import orjson
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb')
-mentions_table = dynamodb.Table(os.environ['MENTIONS_TABLE'])
-trends_table = dynamodb.Table(os.environ['TRENDS_TABLE'])
+# Max concurrent bucket queries
+BUCKET_QUERY_WORKERS = 16
+
+# Keep connections alive across warm invocations
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=BUCKET_QUERY_WORKERS,
+    retries={'max_attempts': 5, 'mode': 'adaptive'}
+)
+
+# Low-level client: thread-safe for the bucket queries, and trend items
+# are written in wire format without the resource serializer
+dynamodb_client = boto3.client('dynamodb', config=BOTO_CONFIG)
+MENTIONS_TABLE = os.environ['MENTIONS_TABLE']
+TRENDS_TABLE = os.environ['TRENDS_TABLE']
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_RETRIES = 5
+
+# GSI on the mentions table keyed by hour bucket ("2024-01-15T14")
+BUCKET_INDEX = 'bucket-timestamp-index'
+
+# Mentions written before items carried a bucket attribute are missing from
+# the index, so trends are aggregated with a parallel scan of the mentions
+# table until USE_BUCKET_INDEX=true is set, after running
+# scripts/backfill_mention_buckets.py
+USE_BUCKET_INDEX = os.environ.get('USE_BUCKET_INDEX', 'false').lower() == 'true'
+SCAN_SEGMENTS = 8
 
 PERIODS = ['24h', '7d', '30d']
+PERIOD_HOURS = {'24h': 24, '7d': 7 * 24, '30d': 30 * 24}
 
 
 def get_period_start(period):
@@ -31,95 +58,175 @@ def get_period_start(period):
     return (now - delta).isoformat()
 
 
-def aggregate_mentions(period):
+def get_period_buckets(period):
+    """Get the hour buckets covering a period, newest first."""
+    now = datetime.now(timezone.utc)
+    hours = PERIOD_HOURS.get(period, 24)
+
+    return [(now - timedelta(hours=h)).strftime('%Y-%m-%dT%H') for h in range(hours + 1)]
+
+
+def query_bucket_mentions(bucket, period_starts):
     """
-    Scan mentions table and aggregate by ticker for the given period.
-    Returns: {ticker: {comments: int, threads: int}}
+    Count mentions per ticker in one hour bucket, for every period the
+    mentions fall into.
+    Returns: {period: {ticker: {comments: int, threads: int}}}
     """
-    period_start = get_period_start(period)
-    ticker_data = {}
+    period_data = {period: {} for period in period_starts}
+    query_kwargs = {
+        'TableName': MENTIONS_TABLE,
+        'IndexName': BUCKET_INDEX,
+        'KeyConditionExpression': '#bucket = :bucket AND timestamp_post_id >= :start',
+        'ExpressionAttributeNames': {'#bucket': 'bucket'},
+        'ExpressionAttributeValues': {
+            ':bucket': {'S': bucket},
+            ':start': {'S': min(period_starts.values())}
+        },
+        'ProjectionExpression': 'ticker, source_type, timestamp_post_id'
+    }
 
-    print(f"Aggregating {period} mentions (since {period_start})...")
+    while True:
+        response = dynamodb_client.query(**query_kwargs)
+        count_mentions(period_data, response.get('Items', []), period_starts)
+
+        if 'LastEvaluatedKey' not in response:
+            return period_data
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
 
-    try:
-        # Scan mentions table with time filter
-        response = mentions_table.scan(
-            FilterExpression='timestamp_post_id >= :start',
-            ExpressionAttributeValues={':start': period_start}
-        )
 
-        for item in response.get('Items', []):
-            ticker = item['ticker']
-            source_type = item.get('source_type', 'post')
+def scan_segment_mentions(segment, period_starts):
+    """
+    Count mentions per ticker in one segment of a parallel mentions table
+    scan, for every period the mentions fall into.
+    Returns: {period: {ticker: {comments: int, threads: int}}}
+    """
+    period_data = {period: {} for period in period_starts}
+    scan_kwargs = {
+        'TableName': MENTIONS_TABLE,
+        'Segment': segment,
+        'TotalSegments': SCAN_SEGMENTS,
+        'FilterExpression': 'timestamp_post_id >= :start',
+        'ExpressionAttributeValues': {
+            ':start': {'S': min(period_starts.values())}
+        },
+        'ProjectionExpression': 'ticker, source_type, timestamp_post_id'
+    }
 
+    while True:
+        response = dynamodb_client.scan(**scan_kwargs)
+        count_mentions(period_data, response.get('Items', []), period_starts)
+
+        if 'LastEvaluatedKey' not in response:
+            return period_data
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def count_mentions(period_data, items, period_starts):
+    """Add mention items to the per-period ticker counts."""
+    for item in items:
+        ticker = item['ticker']['S']
+        counter = 'comments' if item.get('source_type', {}).get('S') == 'comment' else 'threads'
+        timestamp = item['timestamp_post_id']['S']
+
+        for period, period_start in period_starts.items():
+            if timestamp < period_start:
+                continue
+
+            ticker_data = period_data[period]
             if ticker not in ticker_data:
                 ticker_data[ticker] = {'comments': 0, 'threads': 0}
+            ticker_data[ticker][counter] += 1
 
-            if source_type == 'comment':
-                ticker_data[ticker]['comments'] += 1
-            else:
-                ticker_data[ticker]['threads'] += 1
-
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = mentions_table.scan(
-                FilterExpression='timestamp_post_id >= :start',
-                ExpressionAttributeValues={':start': period_start},
-                ExclusiveStartKey=response['LastEvaluatedKey']
+
+def aggregate_mentions():
+    """
+    Aggregate mentions by ticker for every period in one pass.
+    The longest period's hour buckets are queried (in parallel) from the
+    mentions bucket index, or the table is scanned in parallel segments
+    when USE_BUCKET_INDEX is off. Each mention is counted towards every
+    period it falls in.
+    Returns: {period: {ticker: {comments: int, threads: int}}}
+    """
+    period_starts = {period: get_period_start(period) for period in PERIODS}
+    longest_period = max(PERIODS, key=lambda period: PERIOD_HOURS[period])
+    period_data = {period: {} for period in PERIODS}
+
+    with ThreadPoolExecutor(max_workers=BUCKET_QUERY_WORKERS) as executor:
+        if USE_BUCKET_INDEX:
+            buckets = get_period_buckets(longest_period)
+            print(f"Aggregating mentions since {period_starts[longest_period]} ({len(buckets)} buckets)...")
+
+            results = executor.map(
+                lambda bucket: query_bucket_mentions(bucket, period_starts),
+                buckets
             )
+        else:
+            print(f"Scanning mentions since {period_starts[longest_period]} ({SCAN_SEGMENTS} segments)...")
 
-            for item in response.get('Items', []):
-                ticker = item['ticker']
-                source_type = item.get('source_type', 'post')
+            results = executor.map(
+                lambda segment: scan_segment_mentions(segment, period_starts),
+                range(SCAN_SEGMENTS)
+            )
 
-                if ticker not in ticker_data:
-                    ticker_data[ticker] = {'comments': 0, 'threads': 0}
+        for bucket_data in results:
+            for period, counts in bucket_data.items():
+                ticker_data = period_data[period]
 
-                if source_type == 'comment':
-                    ticker_data[ticker]['comments'] += 1
-                else:
-                    ticker_data[ticker]['threads'] += 1
+                for ticker, data in counts.items():
+                    if ticker not in ticker_data:
+                        ticker_data[ticker] = {'comments': 0, 'threads': 0}
 
-        print(f"  Found {len(ticker_data)} unique tickers")
-        return ticker_data
+                    ticker_data[ticker]['comments'] += data['comments']
+                    ticker_data[ticker]['threads'] += data['threads']
 
-    except Exception as e:
-        print(f"Error aggregating mentions for {period}: {e}")
-        raise
+    for period in PERIODS:
+        print(f"  {period}: found {len(period_data[period])} unique tickers")
+
+    return period_data
 
 
 def write_trends(period, ticker_data):
     """
     Write aggregated trend data to trends table.
-    Uses batch writes for efficiency.
+    Uses BatchWriteItem, 25 per request, retrying unprocessed items
+    with exponential backoff.
     """
     now = datetime.now(timezone.utc).isoformat()
 
-    # Prepare items for batch write
-    items = []
+    # Prepare put requests (DynamoDB wire format)
+    requests = []
     for ticker, data in ticker_data.items():
         mention_count = data['comments'] + data['threads']
 
-        items.append({
-            'period': period,
-            'ticker': ticker,
-            'mention_count': Decimal(str(mention_count)),
-            'comment_count': Decimal(str(data['comments'])),
-            'thread_count': Decimal(str(data['threads'])),
-            'last_updated': now
-        })
-
-    # Write in batches of 25 (DynamoDB limit)
-    print(f"Writing {len(items)} trend items to DynamoDB...")
-
-    for i in range(0, len(items), 25):
-        batch = items[i:i+25]
-
-        with trends_table.batch_writer() as writer:
-            for item in batch:
-                writer.put_item(Item=item)
+        requests.append({'PutRequest': {'Item': {
+            'period': {'S': period},
+            'ticker': {'S': ticker},
+            'mention_count': {'N': str(mention_count)},
+            'comment_count': {'N': str(data['comments'])},
+            'thread_count': {'N': str(data['threads'])},
+            'last_updated': {'S': now}
+        }}})
+
+    print(f"Writing {len(requests)} trend items to DynamoDB...")
+
+    for i in range(0, len(requests), BATCH_WRITE_SIZE):
+        request_items = {TRENDS_TABLE: requests[i:i + BATCH_WRITE_SIZE]}
+
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            response = dynamodb_client.batch_write_item(RequestItems=request_items)
+            request_items = response.get('UnprocessedItems')
+
+            if not request_items:
+                break
+            if attempt < BATCH_WRITE_MAX_RETRIES:
+                time.sleep(0.05 * 2 ** attempt)
+        else:
+            raise RuntimeError(
+                f"{len(request_items[TRENDS_TABLE])} trend items unprocessed "
+                f"after {BATCH_WRITE_MAX_RETRIES} retries"
+            )
 
-    print(f"  ✓ Wrote {len(items)} items for period {period}")
+    print(f"  ✓ Wrote {len(requests)} items for period {period}")
 
 
 def lambda_handler(event, context):
@@ -135,13 +242,30 @@ def lambda_handler(event, context):
         'periods': {}
     }
 
-    for period in PERIODS:
-        try:
-            # Aggregate mentions for this period
-            ticker_data = aggregate_mentions(period)
+    try:
+        # One pass over the longest period covers all of them
+        period_data = aggregate_mentions()
 
-            # Write to trends table
-            write_trends(period, ticker_data)
+    except Exception as e:
+        print(f"ERROR aggregating mentions: {e}")
+        period_data = {}
+        for period in PERIODS:
+            results['periods'][period] = {
+                'status': 'error',
+                'error': str(e)
+            }
+
+    # Periods are written to the trends table in parallel
+    with ThreadPoolExecutor(max_workers=len(PERIODS)) as executor:
+        futures = {
+            period: executor.submit(write_trends, period, ticker_data)
+            for period, ticker_data in period_data.items()
+        }
+
+    for period, future in futures.items():
+        ticker_data = period_data[period]
+        try:
+            future.result()
 
             results['periods'][period] = {
                 'unique_tickers': len(ticker_data),
@@ -160,9 +284,9 @@ def lambda_handler(event, context):
     results['duration_seconds'] = duration
 
     print(f"=== Aggregation Complete in {duration:.1f}s ===")
-    print(json.dumps(results, indent=2))
+    print(orjson.dumps(results).decode('utf-8'))
 
     return {
         'statusCode': 200,
-        'body': json.dumps(results)
+        'body': orjson.dumps(results).decode('utf-8')
     }
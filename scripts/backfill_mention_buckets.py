@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Backfill the hour `bucket` attribute on stored mentions.
+
+Mentions written before items carried a `bucket` attribute are missing
+from the bucket-timestamp-index GSI, so the trends aggregator only sees
+them when it scans the mentions table. Run this once, then set
+USE_BUCKET_INDEX=true on the trends aggregator (the
+trends_use_bucket_index Terraform variable). Safe to re-run: only
+mentions without a bucket are updated.
+
+Usage:
+  python scripts/backfill_mention_buckets.py
+"""
+
+import os
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import boto3
+from botocore.config import Config
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+MENTIONS_TABLE = os.environ.get('MENTIONS_TABLE', 'stock-mentions-mentions')
+
+UPDATE_WORKERS = 8
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+dynamodb_client = boto3.client(
+    'dynamodb',
+    region_name=AWS_REGION,
+    config=Config(max_pool_connections=UPDATE_WORKERS, retries={'max_attempts': 10, 'mode': 'adaptive'})
+)
+
+
+def set_bucket(item: Dict[str, Any]) -> bool:
+    """Set the hour bucket on one mention (skipped if since deleted). Returns False if the update failed."""
+    created = datetime.fromtimestamp(int(item['created_utc']['N']), tz=timezone.utc)
+
+    try:
+        dynamodb_client.update_item(
+            TableName=MENTIONS_TABLE,
+            Key={'ticker': item['ticker'], 'timestamp_post_id': item['timestamp_post_id']},
+            UpdateExpression='SET #bucket = :bucket',
+            # Don't recreate mentions deleted since the scan
+            ConditionExpression='attribute_exists(ticker)',
+            ExpressionAttributeNames={'#bucket': 'bucket'},
+            ExpressionAttributeValues={':bucket': {'S': created.strftime('%Y-%m-%dT%H')}}
+        )
+        return True
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        return True
+    except Exception as e:
+        logger.error(f"Error updating {item['ticker']['S']} {item['timestamp_post_id']['S']}: {e}")
+        return False
+
+
+def backfill_buckets():
+    """Scan for mentions without a bucket and set it from created_utc."""
+    scan_kwargs = {
+        'TableName': MENTIONS_TABLE,
+        'FilterExpression': 'attribute_not_exists(#bucket)',
+        'ExpressionAttributeNames': {'#bucket': 'bucket'},
+        'ProjectionExpression': 'ticker, timestamp_post_id, created_utc'
+    }
+    updated = 0
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+        while True:
+            response = dynamodb_client.scan(**scan_kwargs)
+
+            for ok in executor.map(set_bucket, response.get('Items', [])):
+                if ok:
+                    updated += 1
+                else:
+                    failed += 1
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            logger.info(f"Processed {updated} mentions so far")
+
+    logger.info(f"Backfill complete: {updated} mentions processed, {failed} failed")
+
+
+def main():
+    argparse.ArgumentParser(description='Backfill the hour bucket attribute on stored mentions').parse_args()
+    backfill_buckets()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Backfill the trending counts tables from the mentions table.
+
+The worker and mention processor only add mentions to the hourly/daily
+counters as they are written, so mentions stored before the counters
+existed are missing from them. This scans the mentions table and writes
+the exact (comments, threads) count of every bucket it finds, overwriting
+the stored counters, so it is safe to re-run. Stop the worker and the
+mention processor while it runs, or mentions written mid-backfill may be
+counted twice.
+
+Usage:
+  python scripts/backfill_trending_counts.py             # Last 31 days
+  python scripts/backfill_trending_counts.py --days 7
+"""
+
+import os
+import time
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+import boto3
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+MENTIONS_TABLE = os.environ.get('MENTIONS_TABLE', 'stock-mentions-mentions')
+TRENDING_COUNTS_TABLE = os.environ.get('TRENDING_COUNTS_TABLE', 'stock-mentions-trending-counts')
+SUBREDDIT_TRENDING_COUNTS_TABLE = os.environ.get(
+    'SUBREDDIT_TRENDING_COUNTS_TABLE',
+    'stock-mentions-subreddit-trending-counts'
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+dynamodb_client = boto3.client('dynamodb', region_name=AWS_REGION)
+
+# (key attribute, bucket, ticker) -> Counter of 'comments' / 'threads'
+Counts = Dict[Tuple[str, str, str], Counter]
+
+
+def get_time_buckets(created_utc: int):
+    """Get the hourly and daily trending-count buckets for a timestamp (as the worker does)."""
+    dt = datetime.fromtimestamp(created_utc, tz=timezone.utc)
+    return [dt.strftime('%Y-%m-%dT%H'), dt.strftime('%Y-%m-%d')]
+
+
+def count_mentions(since: int) -> Counts:
+    """Scan mentions created at or after `since` and count them per counter key."""
+    counts: Counts = {}
+    scan_kwargs = {
+        'TableName': MENTIONS_TABLE,
+        'FilterExpression': 'created_utc >= :since',
+        'ExpressionAttributeValues': {':since': {'N': str(since)}},
+        'ProjectionExpression': 'ticker, subreddit, source_type, created_utc'
+    }
+    scanned = 0
+
+    while True:
+        response = dynamodb_client.scan(**scan_kwargs)
+
+        for item in response.get('Items', []):
+            ticker = item['ticker']['S']
+            subreddit = item['subreddit']['S']
+            counter = 'comments' if item.get('source_type', {}).get('S') == 'comment' else 'threads'
+
+            for bucket in get_time_buckets(int(item['created_utc']['N'])):
+                for key in (
+                    ('period_bucket', bucket, ticker),
+                    ('subreddit_bucket', f"{subreddit}#{bucket}", ticker)
+                ):
+                    if key not in counts:
+                        counts[key] = Counter()
+                    counts[key][counter] += 1
+
+        scanned += response['ScannedCount']
+        if 'LastEvaluatedKey' not in response:
+            logger.info(f"Scanned {scanned} mentions")
+            return counts
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def write_counts(counts: Counts):
+    """Overwrite the counter items with the computed counts."""
+    tables = {
+        'period_bucket': dynamodb.Table(TRENDING_COUNTS_TABLE),
+        'subreddit_bucket': dynamodb.Table(SUBREDDIT_TRENDING_COUNTS_TABLE)
+    }
+
+    for key_name, table in tables.items():
+        written = 0
+        with table.batch_writer() as batch:
+            for (counter_key, bucket, ticker), counter in counts.items():
+                if counter_key != key_name:
+                    continue
+                batch.put_item(Item={
+                    key_name: bucket,
+                    'ticker': ticker,
+                    'comments': counter['comments'],
+                    'threads': counter['threads']
+                })
+                written += 1
+        logger.info(f"Wrote {written} counters to {table.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the trending counts tables from stored mentions')
+    parser.add_argument(
+        '--days',
+        type=int,
+        default=31,
+        help='Backfill mentions from the last N days (default: 31, covering the 30d period)'
+    )
+    args = parser.parse_args()
+
+    since = int(time.time()) - args.days * 86400
+    logger.info(f"Backfilling trending counts since {datetime.fromtimestamp(since, tz=timezone.utc).isoformat()}")
+
+    write_counts(count_mentions(since))
+
+
+if __name__ == '__main__':
+    main()
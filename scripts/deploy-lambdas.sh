@@ -47,7 +47,9 @@ deploy_lambda() {
     # Install dependencies
     if [ -f "${lambda_dir}/requirements.txt" ]; then
         echo "Installing dependencies..."
-        $PIP_CMD install -r "${lambda_dir}/requirements.txt" -t "${package_dir}" --quiet --upgrade
+        # Compiled dependencies (orjson, pyahocorasick) must match the Lambda runtime
+        $PIP_CMD install -r "${lambda_dir}/requirements.txt" -t "${package_dir}" --quiet --upgrade \
+            --platform manylinux2014_x86_64 --python-version 3.12 --only-binary=:all:
 
         # Remove unnecessary files to reduce package size
         find "${package_dir}" -type d -name "__pycache__" -exec rm -rf {} + 2>/dev/null || true
@@ -0,0 +1,173 @@
+"""
+Unit tests for skipping recently written mentions in worker.py
+
+store_mentions_batch() remembers the keys it wrote in an LRU (_WRITTEN_KEYS)
+so re-fetched posts and comments aren't written to DynamoDB again. Mentions
+are inserted conditionally, so only new ones are added to the trending counts.
+
+Tests cover:
+- Repeated keys are skipped
+- New keys are written
+- LRU eviction makes old keys writable again
+- Already stored mentions aren't counted again
+- Unwritten mentions aren't remembered
+"""
+
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path so we can import worker
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from worker import worker
+from worker.worker import create_mention_item, store_mentions_batch
+
+
+class FakeDynamoDBClient:
+    """
+    Runs batch_execute_statement inserts against an in-memory table.
+    Keys in `unprocessed` are throttled every time.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.stored = set()
+        self.unprocessed = set()
+        self.counted = []
+
+    def batch_execute_statement(self, Statements):
+        responses = []
+        for statement in Statements:
+            names = re.findall(r"'(\w+)': \?", statement['Statement'])
+            item = dict(zip(names, statement['Parameters']))
+            key = worker.mention_key(item)
+
+            if key in self.unprocessed:
+                responses.append({'Error': {'Code': 'ThrottlingError'}})
+                continue
+
+            self.sent.append(key)
+            if key in self.stored:
+                responses.append({'Error': {'Code': 'DuplicateItem'}})
+            else:
+                self.stored.add(key)
+                responses.append({})
+        return {'Responses': responses}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Fake DynamoDB client and an empty written-keys LRU."""
+    fake = FakeDynamoDBClient()
+    monkeypatch.setattr(worker, 'dynamodb_client', fake)
+    monkeypatch.setattr(
+        worker, 'update_trending_counts',
+        lambda mentions: fake.counted.extend(worker.mention_key(item) for item in mentions)
+    )
+    monkeypatch.setattr(worker, 'BATCH_WRITE_MAX_RETRIES', 0)
+    monkeypatch.setattr(worker, '_WRITTEN_KEYS', worker.OrderedDict())
+    return fake
+
+
+def mention(post_id, ticker='TSLA'):
+    """Mention item for a post."""
+    return create_mention_item(ticker, {
+        'post_id': post_id,
+        'subreddit': 'wallstreetbets',
+        'author': 'someone',
+        'upvotes': 1,
+        'url': f'https://reddit.com/{post_id}',
+        'created_utc': 1700000000,
+        'title': f'{ticker} to the moon',
+    }, is_comment=False)
+
+
+def key(post_id, ticker='TSLA'):
+    """Written-keys entry for a post mention."""
+    return worker.mention_key(mention(post_id, ticker))
+
+
+class TestSkipRepeatedKeys:
+    """Test that recently written mentions aren't written again."""
+
+    def test_repeated_key_skipped(self, client):
+        """The same mention stored twice is only written once."""
+        assert store_mentions_batch([mention('p1')]) == 1
+        assert store_mentions_batch([mention('p1')]) == 0
+        assert client.sent == [key('p1')]
+
+    def test_new_key_written(self, client):
+        """A new mention alongside a repeated one is still written."""
+        store_mentions_batch([mention('p1')])
+        assert store_mentions_batch([mention('p1'), mention('p2')]) == 1
+        assert client.sent == [key('p1'), key('p2')]
+
+    def test_same_post_other_ticker_written(self, client):
+        """Keys include the ticker, so other tickers in the same post are new."""
+        store_mentions_batch([mention('p1', 'TSLA')])
+        assert store_mentions_batch([mention('p1', 'NVDA')]) == 1
+
+    def test_unwritten_mention_retried(self, client):
+        """Mentions left unprocessed aren't remembered, so they're written next time."""
+        client.unprocessed = {key('p1')}
+        assert store_mentions_batch([mention('p1'), mention('p2')]) == 1
+
+        client.unprocessed = set()
+        assert store_mentions_batch([mention('p1'), mention('p2')]) == 1
+        assert client.sent == [key('p2'), key('p1')]
+
+    def test_stored_mention_not_counted_again(self, client):
+        """A mention already in the table (e.g. written before a restart) isn't counted."""
+        client.stored = {key('p1')}
+        assert store_mentions_batch([mention('p1'), mention('p2')]) == 1
+        assert client.counted == [key('p2')]
+
+
+class TestLRUEviction:
+    """Test the WRITTEN_KEYS_MAX bound."""
+
+    @pytest.fixture(autouse=True)
+    def small_lru(self, monkeypatch):
+        """Hold two keys so eviction is easy to reach."""
+        monkeypatch.setattr(worker, 'WRITTEN_KEYS_MAX', 2)
+
+    def test_size_bounded(self, client):
+        """The LRU never holds more than WRITTEN_KEYS_MAX keys."""
+        store_mentions_batch([mention('p1'), mention('p2'), mention('p3')])
+        assert len(worker._WRITTEN_KEYS) == 2
+
+    def test_evicted_key_writable_again(self, client):
+        """The oldest key is evicted and sent again, but not counted twice."""
+        store_mentions_batch([mention('p1')])
+        store_mentions_batch([mention('p2')])
+        store_mentions_batch([mention('p3')])
+
+        assert store_mentions_batch([mention('p1')]) == 0
+        assert client.sent == [key('p1'), key('p2'), key('p3'), key('p1')]
+        assert client.counted == [key('p1'), key('p2'), key('p3')]
+
+    def test_evicted_key_remembered_again(self, client):
+        """An evicted key sent again is remembered, so it's skipped next time."""
+        store_mentions_batch([mention('p1')])
+        store_mentions_batch([mention('p2')])
+        store_mentions_batch([mention('p3')])
+        store_mentions_batch([mention('p1')])
+
+        store_mentions_batch([mention('p1')])
+        assert client.sent.count(key('p1')) == 2
+
+    def test_repeated_key_refreshed(self, client):
+        """A skipped key becomes most recent, so the next oldest is evicted instead."""
+        store_mentions_batch([mention('p1')])
+        store_mentions_batch([mention('p2')])
+        store_mentions_batch([mention('p1')])  # Skipped, refreshes p1
+        store_mentions_batch([mention('p3')])  # Evicts p2
+
+        assert store_mentions_batch([mention('p1')]) == 0
+        assert client.sent.count(key('p1')) == 1
+
+        store_mentions_batch([mention('p2')])
+        assert client.sent.count(key('p2')) == 2
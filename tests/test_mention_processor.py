@@ -0,0 +1,188 @@
+"""
+Unit tests for ticker extraction in the mention processor Lambda
+
+The Lambda matches known tickers with Aho-Corasick automatons and checks
+word boundaries around each hit by hand. These tests pin that down against
+the regex extraction it replaced.
+
+Tests cover:
+- Dollar prefix patterns ($TICKER, any case)
+- Plain ticker patterns (uppercase, 2-5 chars)
+- Word boundaries and adjacent punctuation
+- Overlapping tickers (AAP / AAPL / APL)
+- Randomized comparison with the regex extraction
+"""
+
+import os
+import re
+import random
+import importlib.util
+from pathlib import Path
+
+# The handler reads its table names and creates boto3 clients at import
+for name in ('STOCKS_TABLE', 'MENTIONS_TABLE', 'TRENDING_COUNTS_TABLE', 'SUBREDDIT_TRENDING_COUNTS_TABLE'):
+    os.environ.setdefault(name, f'test-{name.lower()}')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+HANDLER_PATH = Path(__file__).parent.parent / 'lambdas' / 'mention-processor' / 'handler.py'
+spec = importlib.util.spec_from_file_location('mention_processor_handler', HANDLER_PATH)
+handler = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(handler)
+
+
+def extract_tickers(text, valid_tickers):
+    """Extract tickers with automatons built from valid_tickers."""
+    return handler.extract_tickers(text, handler.build_ticker_automatons(valid_tickers))
+
+
+def regex_extract_tickers(text, valid_tickers):
+    """The regex extraction the automatons replaced."""
+    found_tickers = set()
+
+    for match in re.finditer(r'\$([A-Z]{1,5})\b', text.upper()):
+        if match.group(1) in valid_tickers:
+            found_tickers.add(match.group(1))
+
+    for match in re.finditer(r'\b([A-Z]{2,5})\b', text):
+        if match.group(1) in valid_tickers:
+            found_tickers.add(match.group(1))
+
+    return list(found_tickers)
+
+
+class TestDollarPrefixPatterns:
+    """Test ticker extraction with $ prefix."""
+
+    valid_tickers = {'TSLA', 'NVDA', 'AAPL', 'GME', 'F'}
+
+    def test_single_dollar_ticker(self):
+        """Single $TICKER should match."""
+        assert extract_tickers("$TSLA to the moon", self.valid_tickers) == ['TSLA']
+
+    def test_multiple_dollar_tickers(self):
+        """Multiple $TICKER in one text should all match."""
+        result = extract_tickers("$TSLA $NVDA $AAPL", self.valid_tickers)
+        assert set(result) == {'TSLA', 'NVDA', 'AAPL'}
+
+    def test_lowercase_dollar_ticker_matched(self):
+        """$ticker is matched case-insensitively."""
+        assert extract_tickers("buying $gme today", self.valid_tickers) == ['GME']
+
+    def test_one_letter_dollar_ticker(self):
+        """One-letter tickers only match with $."""
+        assert extract_tickers("$F is cheap", self.valid_tickers) == ['F']
+        assert extract_tickers("F is cheap", self.valid_tickers) == []
+
+    def test_dollar_ticker_followed_by_letters_not_matched(self):
+        """$TSLAX is not $TSLA."""
+        assert extract_tickers("$TSLAX", self.valid_tickers) == []
+
+    def test_dollar_ticker_followed_by_digit_not_matched(self):
+        """A digit after the ticker is still a word character."""
+        assert extract_tickers("$TSLA1 $GME_", self.valid_tickers) == []
+
+    def test_invalid_dollar_ticker_not_matched(self):
+        """$TICKER not in valid_tickers should not match."""
+        assert extract_tickers("$FAKE $NOTREAL", self.valid_tickers) == []
+
+
+class TestPlainTickerPatterns:
+    """Test ticker extraction without $ prefix."""
+
+    valid_tickers = {'TSLA', 'NVDA', 'AAPL', 'GM'}
+
+    def test_single_plain_ticker(self):
+        """Plain TICKER (uppercase) should match."""
+        assert extract_tickers("TSLA is going up", self.valid_tickers) == ['TSLA']
+
+    def test_lowercase_ticker_not_matched(self):
+        """Lowercase or mixed case ticker should NOT match."""
+        assert extract_tickers("tsla and Tsla", self.valid_tickers) == []
+
+    def test_two_letter_ticker(self):
+        """Two-letter tickers should work if valid."""
+        assert extract_tickers("GM earnings", self.valid_tickers) == ['GM']
+
+    def test_ticker_inside_word_not_matched(self):
+        """Tickers inside longer uppercase words should NOT match."""
+        assert extract_tickers("XTSLA TSLAX GMC", self.valid_tickers) == []
+
+    def test_ticker_next_to_digits_not_matched(self):
+        """Digits and underscores are word characters."""
+        assert extract_tickers("TSLA2 3NVDA GM_", self.valid_tickers) == []
+
+
+class TestWordBoundaries:
+    """Test punctuation and whitespace around tickers."""
+
+    valid_tickers = {'TSLA', 'NVDA', 'AAPL', 'MSFT'}
+
+    def test_trailing_punctuation(self):
+        """Ticker followed by punctuation should match."""
+        result = extract_tickers("Buy AAPL! Sell MSFT. TSLA? NVDA,", self.valid_tickers)
+        assert set(result) == {'AAPL', 'MSFT', 'TSLA', 'NVDA'}
+
+    def test_parentheses_and_quotes(self):
+        """Ticker wrapped in brackets or quotes should match."""
+        result = extract_tickers("Apple (AAPL) and \"TSLA\" and [$NVDA]", self.valid_tickers)
+        assert set(result) == {'AAPL', 'TSLA', 'NVDA'}
+
+    def test_start_and_end_of_text(self):
+        """Tickers at the very start and end of the text."""
+        assert set(extract_tickers("AAPL vs MSFT", self.valid_tickers)) == {'AAPL', 'MSFT'}
+
+    def test_slash_and_newline_separated(self):
+        """Tickers separated by slashes and newlines."""
+        assert set(extract_tickers("AAPL/MSFT\nTSLA", self.valid_tickers)) == {'AAPL', 'MSFT', 'TSLA'}
+
+    def test_apostrophe_suffix(self):
+        """Possessive 's is a boundary (same as the regex extraction)."""
+        assert extract_tickers("TSLA's deliveries", self.valid_tickers) == ['TSLA']
+
+    def test_no_candidates_skipped(self):
+        """Text without $ or an uppercase pair returns nothing."""
+        assert extract_tickers("no tickers here at all", self.valid_tickers) == []
+
+
+class TestOverlappingTickers:
+    """Test tickers that are prefixes, suffixes, or substrings of each other."""
+
+    valid_tickers = {'AAP', 'AAPL', 'APL', 'PL', 'A'}
+
+    def test_longest_whole_word_only(self):
+        """AAPL matches, not the AAP / APL / PL inside it."""
+        assert extract_tickers("AAPL", self.valid_tickers) == ['AAPL']
+
+    def test_prefix_ticker_alone(self):
+        """AAP on its own matches AAP only."""
+        assert extract_tickers("AAP is cheap", self.valid_tickers) == ['AAP']
+
+    def test_dollar_overlapping(self):
+        """$AAPL matches AAPL, not $A or $AAP."""
+        assert extract_tickers("$AAPL", self.valid_tickers) == ['AAPL']
+
+    def test_all_overlapping_as_words(self):
+        """Each ticker matches when it stands alone."""
+        result = extract_tickers("AAP AAPL APL PL $A", self.valid_tickers)
+        assert set(result) == {'AAP', 'AAPL', 'APL', 'PL', 'A'}
+
+
+class TestMatchesRegexExtraction:
+    """Randomized comparison with the regex extraction."""
+
+    valid_tickers = {'A', 'AI', 'AAP', 'AAPL', 'APL', 'GME', 'TSLA', 'SPY', 'ABCDE'}
+    tokens = [
+        'AAPL', 'AAP', 'APL', 'aapl', '$', '$aapl', '$AAP', 'GME', 'gme', 'TSLA', 'TSLAX',
+        'SPY', 'ABCDE', 'ABCDEF', 'AI', 'A', '$A', ' ', '  ', '.', ',', '!', "'", "'s",
+        '_', '1', '(', ')', '/', '\n', 'x', 'é', 'É',
+    ]
+
+    def test_random_texts(self):
+        """Automaton and regex extraction agree on random token soup."""
+        rng = random.Random(0)
+        automatons = handler.build_ticker_automatons(self.valid_tickers)
+
+        for _ in range(20000):
+            text = ''.join(rng.choice(self.tokens) for _ in range(rng.randint(1, 10)))
+            expected = sorted(regex_extract_tickers(text, self.valid_tickers))
+            assert sorted(handler.extract_tickers(text, automatons)) == expected, text
@@ -0,0 +1,105 @@
+"""
+Unit tests for adaptive daemon poll intervals in worker.py
+
+Tests cover:
+- Square-root rule (busier subreddits are polled more often)
+- Overall poll rate matching DAEMON_SLEEP_SECONDS
+- MIN_POLL_SECONDS / MAX_POLL_SECONDS clamping
+- Subreddits without activity history
+"""
+
+import sys
+import math
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path so we can import worker
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from worker import worker
+from worker.worker import get_poll_intervals
+
+POSTS_PER_HOUR = 1 / 3600
+
+
+@pytest.fixture(autouse=True)
+def poll_settings(monkeypatch):
+    """Pin the poll settings regardless of the environment."""
+    monkeypatch.setattr(worker, 'DAEMON_SLEEP_SECONDS', 600)
+    monkeypatch.setattr(worker, 'MIN_POLL_SECONDS', 120)
+    monkeypatch.setattr(worker, 'MAX_POLL_SECONDS', 3600)
+
+
+class TestSquareRootRule:
+    """Test intervals from observed post rates."""
+
+    def test_equal_rates_use_average_interval(self):
+        """Subreddits with the same rate are all polled every DAEMON_SLEEP_SECONDS."""
+        rates = {'a': 10 * POSTS_PER_HOUR, 'b': 10 * POSTS_PER_HOUR}
+        assert get_poll_intervals(['a', 'b'], rates) == pytest.approx({'a': 600, 'b': 600})
+
+    def test_busier_subreddit_polled_more_often(self):
+        """4x the post rate gives half the interval."""
+        rates = {'busy': 40 * POSTS_PER_HOUR, 'quiet': 10 * POSTS_PER_HOUR}
+        intervals = get_poll_intervals(['busy', 'quiet'], rates)
+        assert intervals['busy'] < intervals['quiet']
+        assert intervals['quiet'] / intervals['busy'] == pytest.approx(2)
+
+    def test_total_poll_rate_preserved(self):
+        """Unclamped intervals poll as often overall as a fixed DAEMON_SLEEP_SECONDS."""
+        rates = {'a': 40 * POSTS_PER_HOUR, 'b': 10 * POSTS_PER_HOUR, 'c': 20 * POSTS_PER_HOUR}
+        intervals = get_poll_intervals(list(rates), rates)
+        assert sum(1 / interval for interval in intervals.values()) == pytest.approx(3 / 600)
+
+    def test_only_requested_subreddits_returned(self):
+        """Rates of other subreddits shape the scale but aren't returned."""
+        rates = {'a': 40 * POSTS_PER_HOUR, 'b': 10 * POSTS_PER_HOUR}
+        assert set(get_poll_intervals(['a'], rates)) == {'a'}
+
+
+class TestClamping:
+    """Test MIN_POLL_SECONDS / MAX_POLL_SECONDS bounds."""
+
+    def test_very_busy_subreddit_clamped_to_min(self):
+        """A subreddit far busier than the rest is polled at most every MIN_POLL_SECONDS."""
+        rates = {f'sub{i}': POSTS_PER_HOUR for i in range(9)}
+        rates['busy'] = 10000 * POSTS_PER_HOUR
+        assert get_poll_intervals(['busy'], rates)['busy'] == 120
+
+    def test_very_quiet_subreddit_clamped_to_max(self):
+        """A subreddit far quieter than the rest is polled at least every MAX_POLL_SECONDS."""
+        rates = {'quiet': 0.01 * POSTS_PER_HOUR, 'a': 100 * POSTS_PER_HOUR, 'b': 100 * POSTS_PER_HOUR}
+        assert get_poll_intervals(['quiet'], rates)['quiet'] == 3600
+
+    def test_intervals_within_bounds(self):
+        """Every interval stays within [MIN_POLL_SECONDS, MAX_POLL_SECONDS]."""
+        rates = {f'sub{i}': 10 ** i * POSTS_PER_HOUR for i in range(-3, 5)}
+        for interval in get_poll_intervals(list(rates), rates).values():
+            assert 120 <= interval <= 3600
+
+    def test_zero_rate_gets_finite_interval(self):
+        """A subreddit with no posts observed is still polled (rate floor of one post a day)."""
+        rates = {'dead': 0.0, 'alive': 0.0}
+        intervals = get_poll_intervals(['dead', 'alive'], rates)
+        assert intervals == pytest.approx({'dead': 600, 'alive': 600})
+        assert all(math.isfinite(interval) for interval in intervals.values())
+
+
+class TestNoActivityHistory:
+    """Test subreddits that haven't been polled twice yet."""
+
+    def test_no_rates_use_average_interval(self):
+        """Before any rates are measured, every subreddit uses DAEMON_SLEEP_SECONDS."""
+        assert get_poll_intervals(['a', 'b'], {}) == {'a': 600, 'b': 600}
+
+    def test_new_subreddit_uses_average_interval(self):
+        """A subreddit without a rate uses DAEMON_SLEEP_SECONDS while others adapt."""
+        rates = {'busy': 40 * POSTS_PER_HOUR, 'quiet': 10 * POSTS_PER_HOUR}
+        intervals = get_poll_intervals(['busy', 'new'], rates)
+        assert intervals['new'] == 600
+        assert intervals['busy'] < 600
+
+    def test_no_subreddits(self):
+        """No subreddits due gives no intervals."""
+        assert get_poll_intervals([], {'a': POSTS_PER_HOUR}) == {}
@@ -0,0 +1,144 @@
+"""
+Unit tests for trending counter updates in worker.py
+
+update_trending_counts() sums the mentions of a batch per counter key
+(overall and per-subreddit, hourly and daily) and issues one ADD per key.
+
+Tests cover:
+- One update per counter key, with summed comment/thread deltas
+- Per-subreddit counter keys
+- Failed updates are counted
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path so we can import worker
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from worker import worker
+from worker.worker import create_mention_item, update_trending_counts
+
+CREATED_UTC = 1700000000  # 2023-11-14T22:13:20Z
+
+
+class FakeDynamoDBClient:
+    """Records update_item ADDs per (table, bucket, ticker); buckets in `failing` raise."""
+
+    def __init__(self):
+        self.updates = {}
+        self.failing = set()
+        self.lock = threading.Lock()
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues):
+        bucket = next(value['S'] for name, value in Key.items() if name != 'ticker')
+        if bucket in self.failing:
+            raise Exception('throttled')
+
+        with self.lock:
+            key = (TableName, bucket, Key['ticker']['S'])
+            assert key not in self.updates, f"{key} updated twice"
+            self.updates[key] = (
+                int(ExpressionAttributeValues[':c']['N']),
+                int(ExpressionAttributeValues[':t']['N'])
+            )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Fake DynamoDB client."""
+    fake = FakeDynamoDBClient()
+    monkeypatch.setattr(worker, 'dynamodb_client', fake)
+    return fake
+
+
+def mention(item_id, ticker='TSLA', subreddit='wallstreetbets', is_comment=False, created_utc=CREATED_UTC):
+    """Mention item for a post or comment."""
+    return create_mention_item(ticker, {
+        'post_id': item_id,
+        'comment_id': item_id,
+        'subreddit': subreddit,
+        'author': 'someone',
+        'upvotes': 1,
+        'url': f'https://reddit.com/{item_id}',
+        'created_utc': created_utc,
+    }, is_comment=is_comment)
+
+
+class TestOverallCounters:
+    """Test the period_bucket counters."""
+
+    def test_one_update_per_key(self, client):
+        """Mentions of a ticker in the same hour are summed into one update per bucket."""
+        update_trending_counts([
+            mention('p1'),
+            mention('c1', is_comment=True),
+            mention('c2', is_comment=True),
+        ])
+
+        assert client.updates[(worker.TRENDING_COUNTS_TABLE, '2023-11-14T22', 'TSLA')] == (2, 1)
+        assert client.updates[(worker.TRENDING_COUNTS_TABLE, '2023-11-14', 'TSLA')] == (2, 1)
+
+    def test_hours_summed_into_day(self, client):
+        """Mentions in different hours update separate hourly counters and one daily counter."""
+        update_trending_counts([mention('p1'), mention('p2', created_utc=CREATED_UTC + 3600)])
+
+        assert client.updates[(worker.TRENDING_COUNTS_TABLE, '2023-11-14T22', 'TSLA')] == (0, 1)
+        assert client.updates[(worker.TRENDING_COUNTS_TABLE, '2023-11-14T23', 'TSLA')] == (0, 1)
+        assert client.updates[(worker.TRENDING_COUNTS_TABLE, '2023-11-14', 'TSLA')] == (0, 2)
+
+    def test_no_mentions(self, client):
+        """An empty batch makes no updates."""
+        assert update_trending_counts([]) == 0
+        assert client.updates == {}
+
+
+class TestSubredditCounters:
+    """Test the subreddit_bucket counters."""
+
+    def test_one_update_per_subreddit_key(self, client):
+        """Mentions are summed per subreddit, and across subreddits in the overall counters."""
+        update_trending_counts([
+            mention('p1', subreddit='wallstreetbets'),
+            mention('c1', subreddit='wallstreetbets', is_comment=True),
+            mention('p2', subreddit='stocks'),
+        ])
+
+        table = worker.SUBREDDIT_TRENDING_COUNTS_TABLE
+        assert client.updates[(table, 'wallstreetbets#2023-11-14T22', 'TSLA')] == (1, 1)
+        assert client.updates[(table, 'wallstreetbets#2023-11-14', 'TSLA')] == (1, 1)
+        assert client.updates[(table, 'stocks#2023-11-14T22', 'TSLA')] == (0, 1)
+        assert client.updates[(table, 'stocks#2023-11-14', 'TSLA')] == (0, 1)
+        assert client.updates[(worker.TRENDING_COUNTS_TABLE, '2023-11-14T22', 'TSLA')] == (1, 2)
+
+    def test_update_count(self, client):
+        """Two tickers in two subreddits: 2 tickers x (2 overall + 4 subreddit) buckets."""
+        update_trending_counts([
+            mention(f'{ticker}-{subreddit}-{i}', ticker=ticker, subreddit=subreddit)
+            for ticker in ('TSLA', 'NVDA')
+            for subreddit in ('wallstreetbets', 'stocks')
+            for i in range(3)
+        ])
+
+        assert len(client.updates) == 12
+
+
+class TestFailedUpdates:
+    """Test that failed counter updates are counted."""
+
+    def test_failures_returned(self, client):
+        """Failed updates are returned; the other counters are still updated."""
+        client.failing = {'2023-11-14T22', 'stocks#2023-11-14T22'}
+
+        failed = update_trending_counts([mention('p1'), mention('p2', subreddit='stocks')])
+
+        assert failed == 2
+        assert (worker.TRENDING_COUNTS_TABLE, '2023-11-14', 'TSLA') in client.updates
+        assert (worker.SUBREDDIT_TRENDING_COUNTS_TABLE, 'wallstreetbets#2023-11-14T22', 'TSLA') in client.updates
+
+    def test_no_failures(self, client):
+        """Returns 0 when every update succeeds."""
+        assert update_trending_counts([mention('p1')]) == 0
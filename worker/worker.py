@@ -11,15 +11,25 @@ Usage:
 
 import os
 import re
+import math
+import heapq
 import sys
 import time
+import queue
 import argparse
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from typing import Set, List, Dict, Any, Optional
+from functools import lru_cache
+from typing import Set, FrozenSet, List, Tuple, Dict, Any, Iterator, Optional
 
 import boto3
 import praw
+import prawcore
+import requests
 from botocore.config import Config
 
 # ============================================================================
@@ -33,6 +43,11 @@ AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 STOCKS_TABLE = os.environ.get('STOCKS_TABLE', 'stock-mentions-stocks')
 MENTIONS_TABLE = os.environ.get('MENTIONS_TABLE', 'stock-mentions-mentions')
 METADATA_TABLE = os.environ.get('METADATA_TABLE', 'stock-mentions-metadata')
+TRENDING_COUNTS_TABLE = os.environ.get('TRENDING_COUNTS_TABLE', 'stock-mentions-trending-counts')
+SUBREDDIT_TRENDING_COUNTS_TABLE = os.environ.get(
+    'SUBREDDIT_TRENDING_COUNTS_TABLE',
+    'stock-mentions-subreddit-trending-counts'
+)
 
 # Reddit credentials (from environment or SSM)
 # If not set, will fetch from SSM Parameter Store
@@ -41,6 +56,9 @@ REDDIT_CLIENT_SECRET = os.environ.get('REDDIT_CLIENT_SECRET')
 SSM_CLIENT_ID_PARAM = os.environ.get('SSM_CLIENT_ID_PARAM', '/stock-mentions/reddit_client_id')
 SSM_CLIENT_SECRET_PARAM = os.environ.get('SSM_CLIENT_SECRET_PARAM', '/stock-mentions/reddit_client_secret')
 
+# Prefix for permalinks
+REDDIT_BASE_URL = 'https://reddit.com'
+
 # Target subreddits
 TARGET_SUBREDDITS = os.environ.get(
     'TARGET_SUBREDDITS',
@@ -49,9 +67,16 @@ TARGET_SUBREDDITS = os.environ.get(
 
 # Worker settings
 POSTS_PER_SUBREDDIT = int(os.environ.get('POSTS_PER_SUBREDDIT', '100'))
-DAEMON_SLEEP_SECONDS = int(os.environ.get('DAEMON_SLEEP_SECONDS', '600'))  # 10 minutes
-SUBREDDIT_DELAY_SECONDS = int(os.environ.get('SUBREDDIT_DELAY_SECONDS', '5'))  # Between subreddits
-POST_DELAY_SECONDS = float(os.environ.get('POST_DELAY_SECONDS', '0.5'))  # Between posts
+DDB_WRITE_CONCURRENCY = int(os.environ.get('DDB_WRITE_CONCURRENCY', '4'))  # Parallel batch writes per flush
+COMMENT_FETCH_WORKERS = int(os.environ.get('COMMENT_FETCH_WORKERS', '8'))  # Per subreddit
+REDDIT_CLIENTS = int(os.environ.get('REDDIT_CLIENTS', '8'))  # Concurrent Reddit requests, all threads
+MENTION_FLUSH_SIZE = int(os.environ.get('MENTION_FLUSH_SIZE', '500'))  # Mentions buffered before a parallel write
+MENTION_QUEUE_SIZE = int(os.environ.get('MENTION_QUEUE_SIZE', '4'))  # Flushes waiting for the writer
+TICKER_REFRESH_SECONDS = int(os.environ.get('TICKER_REFRESH_SECONDS', '86400'))  # 1 day
+DAEMON_SLEEP_SECONDS = int(os.environ.get('DAEMON_SLEEP_SECONDS', '600'))  # 10 minutes, average per subreddit
+MIN_POLL_SECONDS = int(os.environ.get('MIN_POLL_SECONDS', '120'))  # Busiest subreddit
+MAX_POLL_SECONDS = int(os.environ.get('MAX_POLL_SECONDS', '3600'))  # Quietest subreddit
+REDDIT_REQUESTS_PER_MINUTE = int(os.environ.get('REDDIT_REQUESTS_PER_MINUTE', '100'))  # HTTP requests, all threads
 
 # ============================================================================
 # Logging setup
@@ -70,55 +95,116 @@ logger = logging.getLogger(__name__)
 
 boto_config = Config(
     region_name=AWS_REGION,
+    max_pool_connections=len(TARGET_SUBREDDITS) * DDB_WRITE_CONCURRENCY,
     retries={'max_attempts': 3, 'mode': 'standard'}
 )
 
 dynamodb = boto3.resource('dynamodb', config=boto_config)
+dynamodb_client = boto3.client('dynamodb', config=boto_config)
 ssm = boto3.client('ssm', config=boto_config)
 
 stocks_table = dynamodb.Table(STOCKS_TABLE)
-mentions_table = dynamodb.Table(MENTIONS_TABLE)
 metadata_table = dynamodb.Table(METADATA_TABLE)
 
+# Mentions are inserted with the low-level client so failed statements
+# can be retried; BatchExecuteStatement runs at most 25 statements
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_RETRIES = 5
+
+# Counter tables by partition key attribute. Counters are updated from
+# several threads, so through the (thread-safe) client.
+COUNTER_TABLES = {
+    'period_bucket': TRENDING_COUNTS_TABLE,
+    'subreddit_bucket': SUBREDDIT_TRENDING_COUNTS_TABLE
+}
+
 # ============================================================================
 # Ticker extraction
 # ============================================================================
 
-# Valid tickers cache
-VALID_TICKERS: Optional[Set[str]] = None
+# Valid tickers cache, refreshed when older than TICKER_REFRESH_SECONDS so
+# a long-running daemon picks up stock syncs
+VALID_TICKERS: Optional[FrozenSet[str]] = None
+VALID_TICKERS_LOADED_AT = 0.0
+
+# Stocks table row holding every ticker as a string set (written by stock-sync)
+ALL_TICKERS_KEY = '__ALL__'
+
+# Ticker pattern, compiled once at import. One pass finds:
+# - dollar: $TICKER, any case
+# - plain: TICKER, uppercase in original
+# - c3ai: "C3.ai" or "C3 AI" (any case) for the AI ticker
+# The negative lookbehind avoids apostrophes (e.g., "don't" → "DON").
+_TICKER_RE = re.compile(
+    r'(?<![a-zA-Z\'])(?:\$(?P<dollar>[A-Za-z]{1,5})\b|\b(?P<plain>[A-Z]{2,5})\b(?![a-zA-Z\']))'
+    r'|(?P<c3ai>(?i:\bC3[\.\s]?AI\b))'
+)
 
+# Every match needs a '$', two adjacent uppercase letters or "c3"; texts
+# without any (most short comments) skip the full pattern
+_CANDIDATE_RE = re.compile(r'[A-Z]{2}|[cC]3')
 
-def load_valid_tickers() -> Set[str]:
-    """Load all valid tickers from DynamoDB stocks table."""
-    global VALID_TICKERS
 
-    if VALID_TICKERS is not None:
-        return VALID_TICKERS
+def read_ticker_list() -> Optional[Set[str]]:
+    """Read the aggregate ticker list row with one get_item (None if missing)."""
+    response = stocks_table.get_item(
+        Key={'ticker': ALL_TICKERS_KEY},
+        ProjectionExpression='tickers'
+    )
+    if 'Item' not in response:
+        return None
+    return set(response['Item']['tickers'])
 
-    VALID_TICKERS = set()
 
-    try:
-        logger.info("Loading valid tickers from DynamoDB...")
-        response = stocks_table.scan(ProjectionExpression='ticker')
+def scan_tickers() -> Set[str]:
+    """Scan every ticker in the stocks table."""
+    tickers = set()
 
+    response = stocks_table.scan(ProjectionExpression='ticker')
+
+    for item in response.get('Items', []):
+        tickers.add(item['ticker'])
+
+    # Handle pagination
+    while 'LastEvaluatedKey' in response:
+        response = stocks_table.scan(
+            ProjectionExpression='ticker',
+            ExclusiveStartKey=response['LastEvaluatedKey']
+        )
         for item in response.get('Items', []):
-            VALID_TICKERS.add(item['ticker'])
+            tickers.add(item['ticker'])
 
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = stocks_table.scan(
-                ProjectionExpression='ticker',
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            for item in response.get('Items', []):
-                VALID_TICKERS.add(item['ticker'])
+    tickers.discard(ALL_TICKERS_KEY)
+    return tickers
+
+
+def load_valid_tickers() -> FrozenSet[str]:
+    """
+    Load all valid tickers from DynamoDB stocks table.
+    Reads the aggregate ticker list row, falling back to a table scan.
+    Returns a frozen snapshot; on a failed refresh the previous snapshot is kept.
+    """
+    global VALID_TICKERS, VALID_TICKERS_LOADED_AT
+
+    if VALID_TICKERS is not None and time.time() - VALID_TICKERS_LOADED_AT < TICKER_REFRESH_SECONDS:
+        return VALID_TICKERS
+
+    try:
+        logger.info("Loading valid tickers from DynamoDB...")
+        tickers = read_ticker_list()
+
+        if tickers is None:
+            logger.info(f"No {ALL_TICKERS_KEY} ticker list found, scanning stocks table")
+            tickers = scan_tickers()
 
+        VALID_TICKERS = frozenset(sys.intern(ticker) for ticker in tickers)
+        VALID_TICKERS_LOADED_AT = time.time()
         logger.info(f"Loaded {len(VALID_TICKERS)} valid tickers")
 
     except Exception as e:
         logger.error(f"Error loading tickers: {e}")
 
-    return VALID_TICKERS
+    return VALID_TICKERS or frozenset()
 
 
 def extract_tickers(text: str, valid_tickers: Set[str]) -> List[str]:
@@ -132,41 +218,98 @@ def extract_tickers(text: str, valid_tickers: Set[str]) -> List[str]:
     - "AI" only matched if prefixed with $ or as "C3.ai"
     - Excludes contractions like "don't" → DON
     """
+    if '$' not in text and not _CANDIDATE_RE.search(text):
+        return []
+
     found_tickers = set()
 
-    # Pattern for $TICKER format
-    # Negative lookbehind to avoid matching apostrophes (e.g., "don't" → "DON")
-    dollar_pattern = r'(?<![a-zA-Z\'])\$([A-Z]{1,5})\b'
-    for match in re.finditer(dollar_pattern, text.upper()):
-        ticker = match.group(1)
-        if ticker in valid_tickers:
-            found_tickers.add(ticker)
+    for match in _TICKER_RE.finditer(text):
+        kind = match.lastgroup
 
-    # Special case: Match "C3.ai" or "C3 AI" for AI ticker
-    c3ai_pattern = r'\bC3[\.\s]?AI\b'
-    if re.search(c3ai_pattern, text, re.IGNORECASE) and 'AI' in valid_tickers:
-        found_tickers.add('AI')
+        if kind == 'dollar':
+            ticker = match.group('dollar').upper()
 
-    # Pattern for plain TICKER format (must be uppercase in original)
-    # Excludes apostrophes and special handling for "AI"
-    plain_pattern = r'(?<![a-zA-Z\'])\b([A-Z]{2,5})\b(?![a-zA-Z\'])'
-    for match in re.finditer(plain_pattern, text):
-        ticker = match.group(1)
+        # Special case: "C3.ai" or "C3 AI" means the AI ticker
+        elif kind == 'c3ai':
+            ticker = 'AI'
 
-        # Skip "AI" in plain format (only match with $ or C3.ai)
-        if ticker == 'AI':
-            continue
+        else:
+            ticker = match.group('plain')
+
+            # Skip "AI" in plain format (only match with $ or C3.ai)
+            if ticker == 'AI':
+                continue
 
         if ticker in valid_tickers:
             found_tickers.add(ticker)
 
     return list(found_tickers)
 
+
+@lru_cache(maxsize=4096)
+def extract_tickers_cached(text: str, valid_tickers: FrozenSet[str]) -> Tuple[str, ...]:
+    """
+    Memoized extract_tickers for repeated texts (quoted titles, copypasta)
+    within a worker cycle. valid_tickers must be frozen once per cycle so
+    its hash is computed only once.
+    """
+    return tuple(extract_tickers(text, valid_tickers))
+
 # ============================================================================
 # Reddit client
 # ============================================================================
 
 
+class RateLimiter:
+    """Thread-safe token bucket shared by the subreddit threads."""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.fill_rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until it is available if the bucket is empty."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+
+            # Reserve the token even when it isn't available yet, so waiting
+            # threads are spaced out instead of all waking at once
+            self.tokens -= 1
+            wait_seconds = -self.tokens / self.fill_rate if self.tokens < 0 else 0
+
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+
+reddit_rate_limiter = RateLimiter(REDDIT_REQUESTS_PER_MINUTE)
+
+
+class RateLimitedSession(requests.Session):
+    """
+    HTTP session for PRAW that takes a rate limiter token for every request,
+    so listings and each "load more" comments request count against the limit.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter):
+        super().__init__()
+        self.rate_limiter = rate_limiter
+
+    def request(self, *args, **kwargs):
+        self.rate_limiter.acquire()
+        return super().request(*args, **kwargs)
+
+# Reddit client pool (and the credentials it was built from) reused across
+# daemon cycles; PRAW also keeps each client's OAuth token. Rebuilt after
+# the TTL so rotated credentials are picked up.
+CREDENTIALS_TTL_SECONDS = 3600
+_REDDIT_CLIENTS: Dict[str, Any] = {'at': 0.0, 'pool': None}
+
+
 def get_reddit_credentials() -> Dict[str, str]:
     """Get Reddit credentials from environment or SSM."""
     if REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET:
@@ -193,48 +336,128 @@ def get_reddit_credentials() -> Dict[str, str]:
     }
 
 
-def create_reddit_client() -> praw.Reddit:
+def create_reddit_client(creds: Dict[str, str]) -> praw.Reddit:
     """Create and return a PRAW Reddit client."""
-    creds = get_reddit_credentials()
-
     reddit = praw.Reddit(
         client_id=creds['client_id'],
         client_secret=creds['client_secret'],
-        user_agent='stock-mentions:v2.0 (by /u/stock-mentions-bot)'
+        user_agent='stock-mentions:v2.0 (by /u/stock-mentions-bot)',
+        requestor_kwargs={'session': RateLimitedSession(reddit_rate_limiter)}
     )
     reddit.read_only = True
 
-    logger.info("Reddit client initialized (read-only mode)")
     return reddit
 
+
+class RedditClientPool:
+    """
+    Fixed set of Reddit clients, each checked out by one thread at a time.
+    PRAW instances aren't thread-safe (e.g. token refreshes aren't
+    synchronized), so threads never share one; the pool size also caps
+    concurrent Reddit requests.
+    """
+
+    def __init__(self, size: int):
+        creds = get_reddit_credentials()
+        self.clients: queue.Queue = queue.Queue()
+        for _ in range(size):
+            self.clients.put(create_reddit_client(creds))
+
+        logger.info("Reddit client pool initialized (%d read-only clients)", size)
+
+    @contextmanager
+    def client(self) -> Iterator[praw.Reddit]:
+        """Check out a client, waiting for one to be returned if all are in use."""
+        reddit = self.clients.get()
+        try:
+            yield reddit
+        finally:
+            self.clients.put(reddit)
+
+
+def get_reddit_pool() -> RedditClientPool:
+    """Get the shared Reddit client pool, creating it when missing or expired."""
+    if _REDDIT_CLIENTS['pool'] is None or time.time() - _REDDIT_CLIENTS['at'] > CREDENTIALS_TTL_SECONDS:
+        _REDDIT_CLIENTS.update(at=time.time(), pool=RedditClientPool(REDDIT_CLIENTS))
+
+    return _REDDIT_CLIENTS['pool']
+
+
+def reset_reddit_pool():
+    """Drop the shared Reddit client pool so the next cycle rebuilds it (e.g. after an auth failure)."""
+    _REDDIT_CLIENTS['pool'] = None
+
+
+def is_auth_error(error: Exception) -> bool:
+    """Whether a PRAW error means the client's credentials or token were rejected."""
+    if isinstance(error, (prawcore.exceptions.OAuthException, prawcore.exceptions.InvalidToken)):
+        return True
+
+    # Rejected client credentials surface from the token endpoint as a plain 401
+    return isinstance(error, prawcore.exceptions.ResponseException) and error.response.status_code == 401
+
 # ============================================================================
 # Metadata tracking
 # ============================================================================
 
 
-def get_last_fetch_time(subreddit: str) -> float:
-    """Get the last fetch timestamp for a subreddit."""
+def author_name(author: Optional[praw.models.Redditor]) -> str:
+    """
+    Name of a post or comment author. .name is set from the listing data,
+    so reading it never fetches the Redditor.
+    """
+    return author.name if author is not None else '[deleted]'
+
+
+# Last fetch (timestamp, newest post ID) by subreddit, kept across daemon
+# cycles. Only one fetcher (this worker or the reddit-fetch Lambda) runs at
+# a time, so the table is only read for subreddits this process hasn't seen yet.
+_LAST_FETCH_CACHE: Dict[str, Tuple[float, Optional[str]]] = {}
+
+# Consecutive empty listings after the newest-post marker, by subreddit. An
+# empty page is normal for a quiet subreddit, but it is also all Reddit
+# returns once the marker post is deleted, so after this many in a row the
+# next poll lists the newest page by time instead.
+MARKER_MAX_EMPTY_POLLS = 5
+_EMPTY_MARKER_POLLS: Dict[str, int] = {}
+
+
+def get_last_fetch(subreddit: str) -> Tuple[float, Optional[str]]:
+    """
+    Get the last fetch timestamp for a subreddit and the ID of the newest
+    post seen then (None if not recorded, e.g. written by the Lambda).
+    """
+    if subreddit in _LAST_FETCH_CACHE:
+        return _LAST_FETCH_CACHE[subreddit]
+
     try:
         response = metadata_table.get_item(
             Key={'key': f'last_fetch_{subreddit}'}
         )
         if 'Item' in response:
-            return float(response['Item']['timestamp'])
+            item = response['Item']
+            _LAST_FETCH_CACHE[subreddit] = (float(item['timestamp']), item.get('post_id'))
+            return _LAST_FETCH_CACHE[subreddit]
     except Exception as e:
         logger.warning(f"Error getting last fetch time for {subreddit}: {e}")
 
     # Default to 1 hour ago
-    return datetime.now(timezone.utc).timestamp() - 3600
+    return datetime.now(timezone.utc).timestamp() - 3600, None
 
 
-def set_last_fetch_time(subreddit: str, timestamp: float):
-    """Update the last fetch timestamp for a subreddit."""
+def set_last_fetch(subreddit: str, timestamp: float, post_id: Optional[str] = None):
+    """Update the last fetch timestamp (and newest post ID) for a subreddit."""
+    item = {
+        'key': f'last_fetch_{subreddit}',
+        'timestamp': str(timestamp),
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }
+    if post_id:
+        item['post_id'] = post_id
+
     try:
-        metadata_table.put_item(Item={
-            'key': f'last_fetch_{subreddit}',
-            'timestamp': str(timestamp),
-            'updated_at': datetime.now(timezone.utc).isoformat()
-        })
+        metadata_table.put_item(Item=item)
+        _LAST_FETCH_CACHE[subreddit] = (timestamp, post_id)
     except Exception as e:
         logger.error(f"Error setting last fetch time for {subreddit}: {e}")
 
@@ -242,61 +465,262 @@ def set_last_fetch_time(subreddit: str, timestamp: float):
 # DynamoDB storage
 # ============================================================================
 
+# Keys of recently written mentions (least recently seen first), so mentions
+# regenerated by an overlapping or retried cycle aren't written, and added to
+# the trending counts, again
+WRITTEN_KEYS_MAX = 100_000
+_WRITTEN_KEYS: 'OrderedDict[Tuple[str, str], None]' = OrderedDict()
+_WRITTEN_KEYS_LOCK = threading.Lock()
+
+
+def mention_key(item: Dict[str, Any]) -> Tuple[str, str]:
+    """Primary key (ticker, timestamp_post_id) of a wire-format mention item."""
+    return item['ticker']['S'], item['timestamp_post_id']['S']
+
 
 def store_mentions_batch(mentions: List[Dict[str, Any]]) -> int:
     """
-    Store mentions in DynamoDB using batch write.
-    Returns number of successfully written items.
+    Store mentions in DynamoDB using batched inserts, skipping recently written ones.
+    Only newly inserted mentions are added to the trending counts, so a
+    mention sent again (e.g. after leaving the written-keys LRU) isn't
+    counted twice.
+    Returns number of newly stored items.
     """
+    with _WRITTEN_KEYS_LOCK:
+        new_mentions = []
+        for item in mentions:
+            key = mention_key(item)
+            if key in _WRITTEN_KEYS:
+                _WRITTEN_KEYS.move_to_end(key)
+            else:
+                new_mentions.append(item)
+
+    if len(new_mentions) < len(mentions):
+        logger.debug("Skipping %d recently written mentions", len(mentions) - len(new_mentions))
+
+    mentions = new_mentions
     if not mentions:
         return 0
 
-    written = 0
+    inserted = []
+    existing = []
 
-    # DynamoDB batch_write_item limit is 25 items
-    for i in range(0, len(mentions), 25):
-        batch = mentions[i:i + 25]
+    # Batches of 25 are written in parallel, capped to avoid write
+    # throughput spikes
+    batches = [mentions[i:i + BATCH_WRITE_SIZE] for i in range(0, len(mentions), BATCH_WRITE_SIZE)]
 
-        try:
-            with mentions_table.batch_writer() as writer:
-                for item in batch:
-                    writer.put_item(Item=item)
-                written += len(batch)
-        except Exception as e:
-            logger.error(f"Error in batch write: {e}")
+    with ThreadPoolExecutor(max_workers=DDB_WRITE_CONCURRENCY) as executor:
+        for batch_inserted, batch_existing in executor.map(write_mention_batch, batches):
+            inserted.extend(batch_inserted)
+            existing.extend(batch_existing)
 
-    return written
+    with _WRITTEN_KEYS_LOCK:
+        for item in inserted + existing:
+            _WRITTEN_KEYS[mention_key(item)] = None
+        while len(_WRITTEN_KEYS) > WRITTEN_KEYS_MAX:
+            _WRITTEN_KEYS.popitem(last=False)
+
+    update_trending_counts(inserted)
+
+    return len(inserted)
+
+
+def insert_statement(item: Dict[str, Any]) -> Dict[str, Any]:
+    """PartiQL INSERT for a mention, which fails with DuplicateItem rather than overwriting."""
+    names = list(item)
+    value = ', '.join(f"'{name}': ?" for name in names)
+    return {
+        'Statement': f'INSERT INTO "{MENTIONS_TABLE}" VALUE {{{value}}}',
+        'Parameters': [item[name] for name in names]
+    }
+
+
+def write_mention_batch(
+    batch: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Insert up to 25 mentions with BatchExecuteStatement, retrying failed
+    statements with exponential backoff. Mentions already stored are left
+    as they are.
+    Returns (inserted, already stored) mentions; mentions still failing
+    after the retries are in neither.
+    """
+    inserted = []
+    existing = []
+    pending = batch
+
+    try:
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            response = dynamodb_client.batch_execute_statement(
+                Statements=[insert_statement(item) for item in pending]
+            )
+
+            failed = []
+            for item, result in zip(pending, response['Responses']):
+                error = result.get('Error')
+                if error is None:
+                    inserted.append(item)
+                elif error.get('Code') == 'DuplicateItem':
+                    existing.append(item)
+                else:
+                    failed.append(item)
+
+            pending = failed
+            if not pending:
+                break
+            if attempt < BATCH_WRITE_MAX_RETRIES:
+                time.sleep(0.05 * 2 ** attempt)
+        else:
+            logger.error("%d mentions not written after %d retries", len(pending), BATCH_WRITE_MAX_RETRIES)
+
+    except Exception as e:
+        logger.error("Error in batch write: %s", e)
+
+    return inserted, existing
+
+
+class MentionWriter:
+    """
+    Background mention writer. Subreddit threads put() mentions on a queue
+    and keep fetching while a writer thread stores them; close() waits for
+    the queue to drain. The queue holds at most MENTION_QUEUE_SIZE flushes,
+    so when writes fall behind (e.g. throttling) put() blocks the fetching
+    threads instead of buffering mentions without bound.
+    """
+
+    _STOP = object()
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue(maxsize=MENTION_QUEUE_SIZE)
+        self.stored: Dict[str, int] = {}
+        self.thread = threading.Thread(target=self._drain, name='mention-writer', daemon=True)
+        self.thread.start()
+
+    def put(self, subreddit_name: str, mentions: List[Dict[str, Any]]):
+        """Queue mentions from a subreddit for writing."""
+        if mentions:
+            self.queue.put((subreddit_name, mentions))
+
+    def close(self) -> Dict[str, int]:
+        """Wait for queued mentions to be written. Returns mentions stored by subreddit."""
+        self.queue.put(self._STOP)
+        self.thread.join()
+        return self.stored
+
+    def _drain(self):
+        while True:
+            entry = self.queue.get()
+            if entry is self._STOP:
+                return
+
+            subreddit_name, mentions = entry
+            try:
+                written = store_mentions_batch(mentions)
+            except Exception as e:
+                logger.error("Error storing mentions for r/%s: %s", subreddit_name, e)
+                written = 0
+
+            self.stored[subreddit_name] = self.stored.get(subreddit_name, 0) + written
+
+
+@lru_cache(maxsize=4096)
+def to_utc(created_utc: float) -> datetime:
+    """UTC datetime for a Reddit timestamp (cached; comments often share timestamps)."""
+    return datetime.fromtimestamp(created_utc, tz=timezone.utc)
+
+
+def get_time_buckets(created_utc: float) -> List[str]:
+    """Get the hourly and daily trending-count buckets for a timestamp."""
+    dt = to_utc(created_utc)
+    return [dt.strftime('%Y-%m-%dT%H'), dt.strftime('%Y-%m-%d')]
+
+
+def update_trending_counts(mentions: List[Dict[str, Any]]) -> int:
+    """
+    Add newly stored mentions to the pre-aggregated trending counts tables
+    (overall and per-subreddit). Deltas are summed per counter key so
+    each counter is updated once, and the updates run in parallel.
+    Returns the number of counter updates that failed.
+    """
+    deltas: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+
+    for item in mentions:
+        counter = 'comments' if item['source_type']['S'] == 'comment' else 'threads'
+        ticker = item['ticker']['S']
+
+        for bucket in get_time_buckets(int(item['created_utc']['N'])):
+            for key in (
+                ('period_bucket', bucket, ticker),
+                ('subreddit_bucket', f"{item['subreddit']['S']}#{bucket}", ticker)
+            ):
+                if key not in deltas:
+                    deltas[key] = {'comments': 0, 'threads': 0}
+                deltas[key][counter] += 1
+
+    if not deltas:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=DDB_WRITE_CONCURRENCY) as executor:
+        failed = sum(not ok for ok in executor.map(add_trending_counts, deltas.keys(), deltas.values()))
+
+    if failed:
+        # The mentions are stored, so they won't be counted again; run
+        # scripts/backfill_trending_counts.py to correct the counters
+        logger.error("%d of %d trending counter updates failed", failed, len(deltas))
+
+    return failed
+
+
+def add_trending_counts(key: Tuple[str, str, str], counts: Dict[str, int]) -> bool:
+    """Add comment/thread deltas to one counter. Returns False if the update failed."""
+    key_name, bucket, ticker = key
+    try:
+        dynamodb_client.update_item(
+            TableName=COUNTER_TABLES[key_name],
+            Key={key_name: {'S': bucket}, 'ticker': {'S': ticker}},
+            UpdateExpression='ADD comments :c, threads :t',
+            ExpressionAttributeValues={
+                ':c': {'N': str(counts['comments'])},
+                ':t': {'N': str(counts['threads'])}
+            }
+        )
+        return True
+    except Exception as e:
+        logger.error("Error updating trending counts for %s (%s): %s", ticker, bucket, e)
+        return False
 
 
 def create_mention_item(ticker: str, data: Dict[str, Any], is_comment: bool) -> Dict[str, Any]:
-    """Create a DynamoDB item for a ticker mention."""
-    timestamp = datetime.fromtimestamp(
-        data['created_utc'],
-        tz=timezone.utc
-    ).isoformat()
+    """
+    Create a DynamoDB item for a ticker mention, already in the low-level
+    wire format so the writer passes it straight to batch_execute_statement.
+    """
+    created = to_utc(data['created_utc'])
+    timestamp = created.isoformat()
 
     item_id = data.get('comment_id') if is_comment else data['post_id']
     sort_key = f"{timestamp}#{item_id}"
 
     item = {
-        'ticker': ticker,
-        'timestamp_post_id': sort_key,
-        'subreddit': data['subreddit'],
-        'post_id': data['post_id'],
-        'author': data['author'],
-        'upvotes': data['upvotes'],
-        'url': data['url'],
-        'created_utc': int(data['created_utc']),
-        'source_type': 'comment' if is_comment else 'post'
+        'ticker': {'S': ticker},
+        'timestamp_post_id': {'S': sort_key},
+        'subreddit': {'S': data['subreddit']},
+        'post_id': {'S': data['post_id']},
+        'author': {'S': data['author']},
+        'upvotes': {'N': str(data['upvotes'])},
+        'url': {'S': data['url']},
+        'created_utc': {'N': str(int(data['created_utc']))},
+        'source_type': {'S': 'comment' if is_comment else 'post'},
+        'bucket': {'S': created.strftime('%Y-%m-%dT%H')}  # bucket-timestamp-index
     }
 
     if is_comment:
-        item['comment_id'] = data['comment_id']
-        item['comment_body'] = data.get('body', '')[:5000]  # Truncate long comments
-        item['parent_id'] = data.get('parent_id', '')
+        item['comment_id'] = {'S': data['comment_id']}
+        item['comment_body'] = {'S': data.get('body', '')[:5000]}  # Truncate long comments
+        item['parent_id'] = {'S': data.get('parent_id', '')}
     else:
-        item['post_title'] = data.get('title', '')
-        item['post_body'] = data.get('selftext', '')[:10000]  # Truncate long posts
+        item['post_title'] = {'S': data.get('title', '')}
+        item['post_body'] = {'S': data.get('selftext', '')[:10000]}  # Truncate long posts
 
     return item
 
@@ -305,32 +729,108 @@ def create_mention_item(ticker: str, data: Dict[str, Any], is_comment: bool) ->
 # ============================================================================
 
 
+def fetch_comment_mentions(
+    pool: RedditClientPool,
+    submission_id: str,
+    subreddit_name: str,
+    last_fetch: float,
+    valid_tickers: FrozenSet[str]
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Fetch all new comments on a post and build their mention items.
+    Returns: (new comments fetched, mention items)
+    """
+    comments_fetched = 0
+    mentions = []
+
+    try:
+        logger.debug("  Fetching comments for post %s...", submission_id)
+
+        # The comment tree is fetched with a client from the pool; the
+        # comments are read from the fetched data once it is returned
+        with pool.client() as reddit:
+            submission = reddit.submission(id=submission_id)
+
+            # replace_more(limit=None) fetches ALL "load more" comment stubs
+            # This can take time on hot posts but ensures we get everything
+            submission.comments.replace_more(limit=None)
+            comments = submission.comments.list()
+
+        for comment in comments:
+            # Skip old comments
+            if comment.created_utc <= last_fetch:
+                continue
+
+            comments_fetched += 1
+
+            comment_data = {
+                'post_id': submission_id,
+                'comment_id': comment.id,
+                'subreddit': subreddit_name,
+                'parent_id': str(comment.parent_id),
+                'body': comment.body,
+                'author': author_name(comment.author),
+                'upvotes': comment.score,
+                'url': REDDIT_BASE_URL + comment.permalink,
+                'created_utc': comment.created_utc
+            }
+
+            # Extract tickers from comment
+            comment_tickers = extract_tickers_cached(comment.body, valid_tickers)
+
+            for ticker in comment_tickers:
+                mentions.append(
+                    create_mention_item(ticker, comment_data, is_comment=True)
+                )
+
+    except Exception as e:
+        # Auth failures abort the subreddit so the clients get rebuilt
+        if is_auth_error(e):
+            raise
+        logger.warning("  Error fetching comments for %s: %s", submission_id, e)
+
+    return comments_fetched, mentions
+
+
 def process_subreddit(
-    reddit: praw.Reddit,
+    pool: RedditClientPool,
     subreddit_name: str,
-    valid_tickers: Set[str],
+    valid_tickers: FrozenSet[str],
+    writer: MentionWriter,
     posts_limit: int = 100
 ) -> Dict[str, int]:
     """
-    Process a single subreddit: fetch posts, comments, extract tickers, store mentions.
+    Process a single subreddit: fetch posts, comments, extract tickers, queue mentions.
+    Comment trees are fetched in parallel (COMMENT_FETCH_WORKERS per subreddit,
+    bounded by the client pool); mentions are stored by the writer while
+    fetching continues.
     Returns stats dict.
     """
     stats = {
         'posts_fetched': 0,
         'comments_fetched': 0,
-        'mentions_stored': 0
+        'mentions_queued': 0,
+        'mentions_stored': 0  # Filled in by run_worker once the writer has drained
     }
 
-    last_fetch = get_last_fetch_time(subreddit_name)
+    last_fetch, last_post_id = get_last_fetch(subreddit_name)
     latest_timestamp = last_fetch
+    latest_post_id = None
     mentions_to_store = []
 
-    logger.info(f"Processing r/{subreddit_name} (posts since {datetime.fromtimestamp(last_fetch)})")
+    logger.info("Processing r/%s (posts since %s)", subreddit_name, datetime.fromtimestamp(last_fetch))
 
     try:
-        subreddit = reddit.subreddit(subreddit_name)
+        # List only posts newer than the newest post seen last time; without
+        # a (trusted) marker, the newest page is filtered by time
+        use_marker = bool(last_post_id) and _EMPTY_MARKER_POLLS.get(subreddit_name, 0) < MARKER_MAX_EMPTY_POLLS
+        params = {'before': f't3_{last_post_id}'} if use_marker else None
+
+        with pool.client() as reddit:
+            listing = list(reddit.subreddit(subreddit_name).new(limit=posts_limit, params=params))
 
-        for submission in subreddit.new(limit=posts_limit):
+        submissions = []
+        for submission in listing:
             # Skip posts older than last fetch
             if submission.created_utc <= last_fetch:
                 continue
@@ -340,6 +840,7 @@ def process_subreddit(
             # Track latest timestamp
             if submission.created_utc > latest_timestamp:
                 latest_timestamp = submission.created_utc
+                latest_post_id = submission.id
 
             # Process post
             post_data = {
@@ -347,122 +848,125 @@ def process_subreddit(
                 'subreddit': subreddit_name,
                 'title': submission.title,
                 'selftext': submission.selftext or '',
-                'author': str(submission.author) if submission.author else '[deleted]',
+                'author': author_name(submission.author),
                 'upvotes': submission.score,
-                'url': f'https://reddit.com{submission.permalink}',
+                'url': REDDIT_BASE_URL + submission.permalink,
                 'created_utc': submission.created_utc
             }
 
             # Extract tickers from post
             post_text = f"{submission.title} {submission.selftext or ''}"
-            post_tickers = extract_tickers(post_text, valid_tickers)
+            post_tickers = extract_tickers_cached(post_text, valid_tickers)
 
             for ticker in post_tickers:
                 mentions_to_store.append(
                     create_mention_item(ticker, post_data, is_comment=False)
                 )
 
-            # Fetch ALL comments
-            try:
-                logger.debug(f"  Fetching comments for post {submission.id}...")
-
-                # replace_more(limit=None) fetches ALL "load more" comment stubs
-                # This can take time on hot posts but ensures we get everything
-                submission.comments.replace_more(limit=None)
-
-                for comment in submission.comments.list():
-                    # Skip old comments
-                    if comment.created_utc <= last_fetch:
-                        continue
-
-                    stats['comments_fetched'] += 1
-
-                    comment_data = {
-                        'post_id': submission.id,
-                        'comment_id': comment.id,
-                        'subreddit': subreddit_name,
-                        'parent_id': str(comment.parent_id),
-                        'body': comment.body,
-                        'author': str(comment.author) if comment.author else '[deleted]',
-                        'upvotes': comment.score,
-                        'url': f'https://reddit.com{comment.permalink}',
-                        'created_utc': comment.created_utc
-                    }
-
-                    # Extract tickers from comment
-                    comment_tickers = extract_tickers(comment.body, valid_tickers)
-
-                    for ticker in comment_tickers:
-                        mentions_to_store.append(
-                            create_mention_item(ticker, comment_data, is_comment=True)
-                        )
+            submissions.append(submission)
 
-            except Exception as e:
-                logger.warning(f"  Error fetching comments for {submission.id}: {e}")
+        # Fetch ALL comments, several posts at a time
+        with ThreadPoolExecutor(max_workers=COMMENT_FETCH_WORKERS) as executor:
+            results = executor.map(
+                lambda submission: fetch_comment_mentions(pool, submission.id, subreddit_name, last_fetch, valid_tickers),
+                submissions
+            )
 
-            # Small delay between posts to respect rate limits
-            time.sleep(POST_DELAY_SECONDS)
+            for comments_fetched, comment_mentions in results:
+                stats['comments_fetched'] += comments_fetched
+                mentions_to_store.extend(comment_mentions)
 
-        # Store all mentions
-        if mentions_to_store:
-            stats['mentions_stored'] = store_mentions_batch(mentions_to_store)
+                # Hand mentions to the writer as they accumulate
+                if len(mentions_to_store) >= MENTION_FLUSH_SIZE:
+                    stats['mentions_queued'] += len(mentions_to_store)
+                    writer.put(subreddit_name, mentions_to_store)
+                    mentions_to_store = []
+
+        # Queue remaining mentions
+        stats['mentions_queued'] += len(mentions_to_store)
+        writer.put(subreddit_name, mentions_to_store)
 
         # Update last fetch time
         if latest_timestamp > last_fetch:
-            set_last_fetch_time(subreddit_name, latest_timestamp)
+            set_last_fetch(subreddit_name, latest_timestamp, latest_post_id)
+
+        if use_marker and latest_timestamp <= last_fetch:
+            _EMPTY_MARKER_POLLS[subreddit_name] = _EMPTY_MARKER_POLLS.get(subreddit_name, 0) + 1
+        else:
+            _EMPTY_MARKER_POLLS.pop(subreddit_name, None)
 
     except Exception as e:
-        logger.error(f"Error processing r/{subreddit_name}: {e}")
+        if is_auth_error(e):
+            logger.error("Reddit auth failed for r/%s: %s", subreddit_name, e)
+            reset_reddit_pool()
+        else:
+            logger.error("Error processing r/%s: %s", subreddit_name, e)
 
     logger.info(
-        f"r/{subreddit_name}: {stats['posts_fetched']} posts, "
-        f"{stats['comments_fetched']} comments, "
-        f"{stats['mentions_stored']} mentions stored"
+        "r/%s: %d posts, %d comments, %d mentions queued",
+        subreddit_name, stats['posts_fetched'], stats['comments_fetched'], stats['mentions_queued']
     )
 
     return stats
 
 
-def run_worker(posts_limit: int = 100) -> Dict[str, Any]:
+def run_worker(posts_limit: int = 100, subreddits: Optional[List[str]] = None) -> Dict[str, Any]:
     """
-    Run a single worker cycle across all subreddits.
-    Returns aggregate stats.
+    Run a single worker cycle across the given subreddits (default: all).
+    Returns aggregate stats, with per-subreddit stats under 'subreddits'.
     """
+    subreddits = subreddits or TARGET_SUBREDDITS
     start_time = time.time()
 
-    # Load valid tickers
+    # Load valid tickers (frozen for extract_tickers_cached)
     valid_tickers = load_valid_tickers()
     if not valid_tickers:
         logger.error("No valid tickers loaded. Run stock_sync.py first!")
         return {'error': 'No tickers loaded'}
 
-    # Create Reddit client
-    reddit = create_reddit_client()
+    # Get (or create) the Reddit clients
+    pool = get_reddit_pool()
 
     # Aggregate stats
     total_stats = {
         'posts_fetched': 0,
         'comments_fetched': 0,
         'mentions_stored': 0,
-        'subreddits_processed': 0
+        'subreddits_processed': 0,
+        'subreddits': {}
     }
 
-    for subreddit_name in TARGET_SUBREDDITS:
-        stats = process_subreddit(reddit, subreddit_name, valid_tickers, posts_limit)
+    writer = MentionWriter()
+
+    # All subreddits are processed concurrently; the client pool caps
+    # concurrent Reddit requests and the shared rate limiter paces every
+    # request within Reddit's per-app limit
+    with ThreadPoolExecutor(max_workers=len(subreddits)) as executor:
+        futures = {
+            executor.submit(process_subreddit, pool, subreddit_name, valid_tickers, writer, posts_limit): subreddit_name
+            for subreddit_name in subreddits
+        }
+
+        for future in as_completed(futures):
+            stats = future.result()
+            total_stats['subreddits'][futures[future]] = stats
 
-        total_stats['posts_fetched'] += stats['posts_fetched']
-        total_stats['comments_fetched'] += stats['comments_fetched']
-        total_stats['mentions_stored'] += stats['mentions_stored']
-        total_stats['subreddits_processed'] += 1
+            total_stats['posts_fetched'] += stats['posts_fetched']
+            total_stats['comments_fetched'] += stats['comments_fetched']
+            total_stats['subreddits_processed'] += 1
 
-        # Delay between subreddits
-        if subreddit_name != TARGET_SUBREDDITS[-1]:
-            logger.info(f"Waiting {SUBREDDIT_DELAY_SECONDS}s before next subreddit...")
-            time.sleep(SUBREDDIT_DELAY_SECONDS)
+    # Wait for the writer to store everything queued this cycle
+    for subreddit_name, stored in writer.close().items():
+        total_stats['subreddits'][subreddit_name]['mentions_stored'] = stored
+        total_stats['mentions_stored'] += stored
 
     elapsed = time.time() - start_time
     total_stats['elapsed_seconds'] = round(elapsed, 2)
 
+    # Bound the extraction cache to one cycle
+    logger.info(f"Ticker extraction cache: {extract_tickers_cached.cache_info()}")
+    extract_tickers_cached.cache_clear()
+
     logger.info(
         f"Worker cycle complete: {total_stats['posts_fetched']} posts, "
         f"{total_stats['comments_fetched']} comments, "
@@ -472,22 +976,79 @@ def run_worker(posts_limit: int = 100) -> Dict[str, Any]:
     return total_stats
 
 
+def get_poll_intervals(subreddits: List[str], post_rates: Dict[str, float]) -> Dict[str, float]:
+    """
+    Poll interval per subreddit from its post rate (posts per second).
+
+    For a fixed number of polls, mean detection delay is minimized by
+    intervals proportional to 1/sqrt(rate). Intervals are scaled so the
+    total poll rate matches polling each subreddit every
+    DAEMON_SLEEP_SECONDS, then clamped to [MIN_POLL_SECONDS, MAX_POLL_SECONDS].
+    Subreddits without a measured rate yet are polled every DAEMON_SLEEP_SECONDS.
+    """
+    intervals = {name: float(DAEMON_SLEEP_SECONDS) for name in subreddits}
+
+    if not post_rates:
+        return intervals
+
+    # Floor of one post a day so quiet subreddits still get polled
+    roots = {name: math.sqrt(max(rate, 1 / 86400)) for name, rate in post_rates.items()}
+    scale = DAEMON_SLEEP_SECONDS * sum(roots.values()) / len(roots)
+
+    for name in subreddits:
+        if name in roots:
+            intervals[name] = min(MAX_POLL_SECONDS, max(MIN_POLL_SECONDS, scale / roots[name]))
+
+    return intervals
+
+
 def run_daemon():
-    """Run worker in daemon mode (continuous loop)."""
-    logger.info(f"Starting daemon mode (sleep interval: {DAEMON_SLEEP_SECONDS}s)")
+    """
+    Run worker in daemon mode (continuous loop).
+    Each subreddit is polled on its own schedule, adapted to its post rate.
+    """
+    logger.info(f"Starting daemon mode (average poll interval: {DAEMON_SLEEP_SECONDS}s)")
+
+    post_rates: Dict[str, float] = {}  # Smoothed posts per second
+    last_polled: Dict[str, float] = {}
+
+    # (due time, subreddit) min-heap; everything is due at start
+    schedule = [(0.0, subreddit_name) for subreddit_name in TARGET_SUBREDDITS]
+    heapq.heapify(schedule)
 
     cycle = 0
     while True:
+        wait_seconds = schedule[0][0] - time.time()
+        if wait_seconds > 0:
+            logger.info("Sleeping for %.0fs...", wait_seconds)
+            time.sleep(wait_seconds)
+
+        now = time.time()
+        due = []
+        while schedule and schedule[0][0] <= now:
+            due.append(heapq.heappop(schedule)[1])
+
         cycle += 1
-        logger.info(f"=== Daemon cycle {cycle} ===")
+        logger.info(f"=== Daemon cycle {cycle}: {', '.join(due)} ===")
 
         try:
-            run_worker()
+            stats = run_worker(subreddits=due)
         except Exception as e:
             logger.error(f"Error in worker cycle: {e}")
-
-        logger.info(f"Sleeping for {DAEMON_SLEEP_SECONDS}s...")
-        time.sleep(DAEMON_SLEEP_SECONDS)
+            stats = {}
+
+        # Post rate since each subreddit's previous poll, smoothed
+        for subreddit_name, subreddit_stats in stats.get('subreddits', {}).items():
+            if subreddit_name in last_polled:
+                rate = subreddit_stats['posts_fetched'] / max(now - last_polled[subreddit_name], 1)
+                previous = post_rates.get(subreddit_name, rate)
+                post_rates[subreddit_name] = 0.3 * rate + 0.7 * previous
+            last_polled[subreddit_name] = now
+
+        intervals = get_poll_intervals(due, post_rates)
+        finished = time.time()
+        for subreddit_name in due:
+            heapq.heappush(schedule, (finished + intervals[subreddit_name], subreddit_name))
 
 # ============================================================================
 # CLI